@@ -0,0 +1,419 @@
+import json
+import os
+import numpy as np
+import random
+import time
+from functools import lru_cache
+
+from engine import board_tables
+from features import frontier_size, powerup_distance
+from profiling import profiler
+
+# Evaluation weights for tiles owned, moves available, distance to the center, distance to the
+# nearest powerup and frontier size (owned tiles next to one that isn't). tune.py fits them and
+# writes WEIGHTS_PATH, which is loaded at import when it exists
+DEFAULT_WEIGHTS = {'tiles': 1.0, 'mobility': 0.2, 'center': -0.05, 'powerup': 0.0, 'frontier': 0.0}
+WEIGHTS_PATH = os.environ.get('TERRITORY_WEIGHTS', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'weights.json'))
+
+def load_weights(path=WEIGHTS_PATH):
+    # DEFAULT_WEIGHTS overridden by the "weights" object of a tune.py output file, if there is one
+    weights = dict(DEFAULT_WEIGHTS)
+    if path and os.path.exists(path):
+        with open(path) as f:
+            loaded = json.load(f)['weights']
+        unknown = set(loaded) - set(DEFAULT_WEIGHTS)
+        if unknown:
+            raise ValueError(f"{path}: unknown weights {', '.join(sorted(unknown))}")
+        weights.update(loaded)
+    return weights
+
+# Weights used when a search isn't given its own
+eval_weights = load_weights()
+
+def heuristic(board, player, rows, cols, player_positions, weights=None, powerups=None):
+    # Heuristic: controlled tiles + available moves + distance to center, plus distance to the
+    # nearest powerup and frontier size when those are weighted
+    w = weights or eval_weights
+    r, c = player_positions[player]
+    score = np.sum(board == player)
+    moves = len(board_tables(rows, cols).moves4[r*cols + c])
+    #Center control (to come back in center)
+    center = (rows//2, cols//2)
+    dist_to_center = abs(r-center[0]) + abs(c-center[1])
+    value = w['tiles']*score + w['mobility']*moves + w['center']*dist_to_center
+    if w['powerup'] and powerups is not None:
+        value += w['powerup']*powerup_distance(powerups)[r, c]
+    if w['frontier']:
+        value += w['frontier']*frontier_size(board, player)
+    return value
+
+@lru_cache(maxsize=None)
+def eval_tables(rows, cols):
+    # Per-cell move count and distance to center used by heuristic(), indexed by row*cols + col
+    center = (rows//2, cols//2)
+    mobility = [len(moves) for moves in board_tables(rows, cols).moves4]
+    center_dist = [abs(r-center[0]) + abs(c-center[1]) for r in range(rows) for c in range(cols)]
+    return mobility, center_dist
+
+@lru_cache(maxsize=None)
+def neighbor_cells(rows, cols):
+    # board_tables().moves4 as cell indices
+    return [[r*cols + c for r, c in moves] for moves in board_tables(rows, cols).moves4]
+
+class Evaluator:
+    # heuristic() without touching the board: tile counts, and frontier sizes when they are
+    # weighted, are kept up to date on make/unmake. Powerups don't move during a search, so
+    # their distances are a per-cell table
+    def __init__(self, board, rows, cols, weights=None, powerups=None):
+        w = weights or eval_weights
+        self.cols = cols
+        self.counts = [int(np.sum(board == 0)), int(np.sum(board == 1))]
+        self.mobility, self.center_dist = eval_tables(rows, cols)
+        self.tile_weight, self.mobility_weight, self.center_weight = w['tiles'], w['mobility'], w['center']
+        self.powerup_weight = w['powerup'] if powerups is not None else 0.0
+        if self.powerup_weight:
+            self.powerup_dist = powerup_distance(powerups).ravel().tolist()
+        self.frontier_weight = w['frontier']
+        if self.frontier_weight:
+            self.owner = board.ravel().tolist()
+            self.neighbors = neighbor_cells(rows, cols)
+            # Neighbors with a different owner, per cell; an owned cell with any is on the frontier
+            self.diff = [sum(self.owner[n] != owner for n in cells) for owner, cells in zip(self.owner, self.neighbors)]
+            self.frontier = [frontier_size(board, 0), frontier_size(board, 1)]
+
+    def _set_owner(self, cell, new):
+        # Only the cell and its neighbors can enter or leave a frontier; new differs from the old owner
+        owner, diff, frontier = self.owner, self.diff, self.frontier
+        old = owner[cell]
+        if old != -1 and diff[cell]:
+            frontier[old] -= 1
+        owner[cell] = new
+        count = 0
+        for n in self.neighbors[cell]:
+            o = owner[n]
+            if o == new:
+                diff[n] -= 1
+                if not diff[n] and o != -1:
+                    frontier[o] -= 1
+            else:
+                count += 1
+                if o == old:
+                    diff[n] += 1
+                    if diff[n] == 1 and o != -1:
+                        frontier[o] += 1
+        diff[cell] = count
+        if new != -1 and count:
+            frontier[new] += 1
+
+    def make(self, player, prev_owner, cell=None):
+        if prev_owner != player:
+            self.counts[player] += 1
+            if prev_owner != -1:
+                self.counts[prev_owner] -= 1
+            if self.frontier_weight:
+                self._set_owner(cell, player)
+
+    def unmake(self, player, prev_owner, cell=None):
+        if prev_owner != player:
+            self.counts[player] -= 1
+            if prev_owner != -1:
+                self.counts[prev_owner] += 1
+            if self.frontier_weight:
+                self._set_owner(cell, prev_owner)
+
+    def evaluate(self, player, player_positions):
+        cell = player_positions[player][0] * self.cols + player_positions[player][1]
+        value = self.tile_weight*self.counts[player] + self.mobility_weight*self.mobility[cell] + self.center_weight*self.center_dist[cell]
+        if self.powerup_weight:
+            value += self.powerup_weight*self.powerup_dist[cell]
+        if self.frontier_weight:
+            value += self.frontier_weight*self.frontier[player]
+        return value
+
+# Difficulty index of "Hard+", which searches with minimax instead of picking randomly
+HARD_PLUS = 3
+SEARCH_DEPTH = 8
+# Iterative deepening: share of the current move delay the search may use, and its depth cap
+SEARCH_TIME_FRACTION = 0.2
+MAX_SEARCH_DEPTH = 32
+TABLE_SIZE = 1 << 16
+
+# Depth, value, time and node count of the most recent Hard+ search
+last_search = {'depth': 0, 'value': 0.0, 'time_ms': 0.0, 'nodes': 0}
+
+# Transposition table bound types
+EXACT, LOWER, UPPER = 0, 1, 2
+
+class SearchTimeout(Exception):
+    pass
+
+class Zobrist:
+    # Random 64-bit keys for tile owners, player positions, side to move, searching player and
+    # powerup cells. Powerups don't change during a search, so they only go into the root key
+    def __init__(self, rows, cols, seed=0):
+        rng = random.Random(seed)
+        cells = rows * cols
+        self.cols = cols
+        self.owner = [[rng.getrandbits(64) for _ in range(cells)] for _ in range(2)]
+        self.position = [[rng.getrandbits(64) for _ in range(cells)] for _ in range(2)]
+        self.side = rng.getrandbits(64)
+        self.max_player = rng.getrandbits(64)
+        self.powerup = [rng.getrandbits(64) for _ in range(cells)]
+
+    def hash(self, board, player_positions, player, max_player, powerups=None):
+        key = 0
+        for (r, c), owner in np.ndenumerate(board):
+            if owner != -1:
+                key ^= self.owner[owner][r * self.cols + c]
+        for p in [0, 1]:
+            key ^= self.position[p][player_positions[p][0] * self.cols + player_positions[p][1]]
+        if player == 1:
+            key ^= self.side
+        if max_player == 1:
+            key ^= self.max_player
+        if powerups is not None:
+            # Leaf values depend on the powerup layout once it is weighted, so a table kept
+            # across moves must not mix layouts
+            for cell in np.flatnonzero(powerups != -1):
+                key ^= self.powerup[cell]
+        return key
+
+    def move(self, key, player, prev_owner, from_pos, to_pos):
+        # Key after player steps from from_pos to to_pos and takes the tile from prev_owner
+        cell = to_pos[0] * self.cols + to_pos[1]
+        if prev_owner != -1:
+            key ^= self.owner[prev_owner][cell]
+        key ^= self.owner[player][cell]
+        key ^= self.position[player][from_pos[0] * self.cols + from_pos[1]] ^ self.position[player][cell]
+        return key ^ self.side
+
+class TranspositionTable:
+    # Fixed-size table indexed by the low bits of the Zobrist key. A slot is replaced when the
+    # new entry is at least as deep or the old one is from an earlier search
+    def __init__(self, rows, cols, size=TABLE_SIZE):
+        self.zobrist = Zobrist(rows, cols)
+        self.mask = size - 1
+        self.slots = [None] * size
+        self.generation = 0
+        self.probes = self.hits = self.cutoffs = self.stores = 0
+        # probes and hits already handed to the profiler
+        self.reported = (0, 0)
+
+    def new_search(self):
+        self.generation += 1
+
+    def probe(self, key):
+        self.probes += 1
+        entry = self.slots[key & self.mask]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key, depth, flag, value, move):
+        idx = key & self.mask
+        old = self.slots[idx]
+        if old is None or old[0] == key or depth >= old[1] or old[5] != self.generation:
+            self.slots[idx] = (key, depth, flag, value, move, self.generation)
+            self.stores += 1
+
+    def stats(self):
+        return {
+            'probes': self.probes,
+            'hits': self.hits,
+            'hit_rate': self.hits / self.probes if self.probes else 0.0,
+            'cutoffs': self.cutoffs,
+            'stores': self.stores,
+            'filled': sum(slot is not None for slot in self.slots) / len(self.slots),
+        }
+
+def ordered_moves(board, powerups, pos, rows, cols, player, first_move=None):
+    moves = list(board_tables(rows, cols).moves4[pos[0]*cols + pos[1]])
+    # Powerup tiles first, then enemy tiles, then empty, then our own, so cutoffs come early
+    if powerups is not None:
+        moves.sort(key=lambda m: (powerups[m] == -1, 0 if board[m] == 1-player else 1 if board[m] == -1 else 2))
+    # A known best move (previous iteration or transposition table) goes before all of them
+    if first_move is not None and tuple(first_move) in moves:
+        moves.remove(tuple(first_move))
+        moves.insert(0, tuple(first_move))
+    return moves
+
+def minimax(board, player_positions, rows, cols, player, depth, maximizing, max_player, min_player, alpha=-float('inf'), beta=float('inf'), powerups=None, deadline=None, table=None, key=0, evaluator=None, weights=None):
+    # Leaves are scored by evaluator; a top-level call without one gets an Evaluator for weights
+    # (eval_weights by default) that the recursion shares
+    if evaluator is None:
+        evaluator = Evaluator(board, rows, cols, weights, powerups)
+    last_search['nodes'] += 1
+    if deadline is not None and time.perf_counter() > deadline:
+        raise SearchTimeout()
+    if depth == 0:
+        return evaluator.evaluate(max_player, player_positions)
+    alpha_orig, beta_orig = alpha, beta
+    tt_move = None
+    if table is not None:
+        entry = table.probe(key)
+        if entry is not None:
+            tt_move = entry[4]
+            if entry[1] >= depth:
+                flag, value = entry[2], entry[3]
+                if flag == EXACT:
+                    table.cutoffs += 1
+                    return value
+                if flag == LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    table.cutoffs += 1
+                    return value
+    moves = ordered_moves(board, powerups, player_positions[player], rows, cols, player, tt_move)
+    if not moves:
+        return evaluator.evaluate(max_player, player_positions)
+    best = -float('inf') if maximizing else float('inf')
+    best_move = None
+    prev_pos = player_positions[player]
+    for nr, nc in moves:
+        # Make the move in place and undo it afterwards instead of copying the board
+        prev_owner = board[nr, nc]
+        child_key = table.zobrist.move(key, player, prev_owner, prev_pos, (nr, nc)) if table is not None else 0
+        player_positions[player] = [nr, nc]
+        board[nr, nc] = player  # Steal tile
+        evaluator.make(player, prev_owner, nr*cols + nc)
+        val = minimax(board, player_positions, rows, cols, 1-player, depth-1, not maximizing, max_player, min_player, alpha, beta, powerups, deadline, table, child_key, evaluator)
+        evaluator.unmake(player, prev_owner, nr*cols + nc)
+        board[nr, nc] = prev_owner
+        player_positions[player] = prev_pos
+        if maximizing:
+            if val > best:
+                best, best_move = val, (nr, nc)
+            alpha = max(alpha, best)
+        else:
+            if val < best:
+                best, best_move = val, (nr, nc)
+            beta = min(beta, best)
+        if alpha >= beta:
+            break
+    if table is not None:
+        flag = UPPER if best <= alpha_orig else LOWER if best >= beta_orig else EXACT
+        table.store(key, depth, flag, best, best_move)
+    return best
+
+def search_move(board, player_positions, rows, cols, player_idx, depth, powerups=None, deadline=None, first_move=None, table=None, weights=None):
+    # Root of the alpha-beta search; returns (best move, its value)
+    board = board.copy()
+    positions = [list(pos) for pos in player_positions]
+    key = table.zobrist.hash(board, positions, player_idx, player_idx, powerups) if table is not None else 0
+    evaluator = Evaluator(board, rows, cols, weights, powerups)
+    best_move, alpha = None, -float('inf')
+    for nr, nc in ordered_moves(board, powerups, positions[player_idx], rows, cols, player_idx, first_move):
+        prev_owner = board[nr, nc]
+        prev_pos = positions[player_idx]
+        child_key = table.zobrist.move(key, player_idx, prev_owner, prev_pos, (nr, nc)) if table is not None else 0
+        positions[player_idx] = [nr, nc]
+        board[nr, nc] = player_idx
+        evaluator.make(player_idx, prev_owner, nr*cols + nc)
+        val = minimax(board, positions, rows, cols, 1-player_idx, depth-1, False, player_idx, 1-player_idx, alpha, float('inf'), powerups, deadline, table, child_key, evaluator)
+        evaluator.unmake(player_idx, prev_owner, nr*cols + nc)
+        board[nr, nc] = prev_owner
+        positions[player_idx] = prev_pos
+        if best_move is None or val > alpha:
+            best_move, alpha = [nr, nc], val
+    return best_move, alpha
+
+def iterative_deepening(board, player_positions, rows, cols, player_idx, time_budget_ms, powerups=None, max_depth=MAX_SEARCH_DEPTH, table=None, pool=None, on_depth=None, weights=None):
+    # Search depth 1, 2, ... until the budget runs out; returns (move, value, deepest finished depth).
+    # pool is an optional parallel.ParallelSearch; on_depth(move, value, depth) is called after every
+    # finished depth and stops the search early by returning True. weights default to eval_weights
+    search = pool.search if pool is not None else search_move
+    start = time.perf_counter()
+    deadline = start + time_budget_ms / 1000
+    last_search['nodes'] = 0
+    if table is not None:
+        table.new_search()
+    best_move, best_val, reached = None, 0.0, 0
+    for depth in range(1, max_depth + 1):
+        try:
+            # Depth 1 always finishes so there is a move to play; deeper ones try the last best move first
+            move, val = search(board, player_positions, rows, cols, player_idx, depth, powerups, deadline if depth > 1 else None, best_move, table, weights)
+        except SearchTimeout:
+            break
+        best_move, best_val, reached = move, val, depth
+        if on_depth is not None and on_depth(move, val, depth):
+            break
+        if time.perf_counter() > deadline:
+            break
+    last_search.update(depth=reached, value=float(best_val), time_ms=(time.perf_counter() - start) * 1000)
+    record_search(table)
+    return best_move, best_val, reached
+
+def record_search(table=None):
+    # Feed the search that just finished to the profiler
+    if not profiler.enabled:
+        return
+    profiler.record('search', last_search['time_ms'])
+    profiler.count('searches')
+    profiler.count('search_depth_total', last_search['depth'])
+    profiler.count('minimax_nodes', last_search['nodes'])
+    if table is not None:
+        # Table counters are cumulative; count only what this search added
+        probes, hits = table.probes, table.hits
+        profiler.count('tt_probes', probes - table.reported[0])
+        profiler.count('tt_hits', hits - table.reported[1])
+        table.reported = (probes, hits)
+
+def fixed_depth_search(board, player_positions, rows, cols, player_idx, depth, powerups=None, table=None, pool=None, weights=None):
+    search = pool.search if pool is not None else search_move
+    last_search['nodes'] = 0
+    if table is not None:
+        table.new_search()
+    start = time.perf_counter()
+    move, val = search(board, player_positions, rows, cols, player_idx, depth, powerups, table=table, weights=weights)
+    last_search.update(depth=depth, value=float(val), time_ms=(time.perf_counter() - start) * 1000)
+    record_search(table)
+    return move, val
+
+def search_stats(board, player_positions, rows, cols, player_idx, depth, powerups=None):
+    # Same fixed-depth search with and without a transposition table, for measuring what it saves
+    fixed_depth_search(board, player_positions, rows, cols, player_idx, depth, powerups)
+    nodes_plain = last_search['nodes']
+    table = TranspositionTable(rows, cols)
+    fixed_depth_search(board, player_positions, rows, cols, player_idx, depth, powerups, table)
+    nodes_table = last_search['nodes']
+    return dict(table.stats(), nodes_plain=nodes_plain, nodes_table=nodes_table,
+                node_reduction=1 - nodes_table / nodes_plain if nodes_plain else 0.0)
+
+def ai_move(board, pos, rows, cols, difficulty, player_idx, player_positions, mode, powerups, time_budget_ms=None, table=None, pool=None, rng=random, depth=SEARCH_DEPTH, weights=None):
+    # rng is the player's own random.Random (GameState.player_rngs) for reproducible games.
+    # Hard+ searches for time_budget_ms, or to depth when there is no budget, evaluating
+    # positions with weights (eval_weights by default)
+    with profiler.timer('ai_move'):
+        return choose_move(board, pos, rows, cols, difficulty, player_idx, player_positions, mode, powerups, time_budget_ms, table, pool, rng, depth, weights)
+
+def choose_move(board, pos, rows, cols, difficulty, player_idx, player_positions, mode, powerups, time_budget_ms=None, table=None, pool=None, rng=random, depth=SEARCH_DEPTH, weights=None):
+    #Get possible moves
+    possible_moves = board_tables(rows, cols).moves4[pos[0]*cols + pos[1]]
+
+    # If no possible moves, return current position
+    if not possible_moves:
+        return list(pos)
+
+    # 1. PRIORITIZE POWERUPS
+    for move in possible_moves:
+        if powerups[move[0], move[1]] != -1:
+            return [move[0], move[1]]
+
+    # 2. Otherwise, use difficulty logic
+    if difficulty == HARD_PLUS:
+        if time_budget_ms is None:
+            return fixed_depth_search(board, player_positions, rows, cols, player_idx, depth, powerups, table, pool, weights)[0]
+        return iterative_deepening(board, player_positions, rows, cols, player_idx, time_budget_ms, powerups, table=table, pool=pool, weights=weights)[0]
+    if difficulty == 0:
+        return list(rng.choice(possible_moves))
+
+    smartness = 0.7 if difficulty == 1 else 0.9
+    good_moves = [move for move in possible_moves if board[move[0], move[1]] != player_idx]
+    
+    if good_moves and rng.random() < smartness:
+        return list(rng.choice(good_moves))
+    else:
+        return list(rng.choice(possible_moves))
@@ -0,0 +1,149 @@
+import multiprocessing
+import queue
+import time
+
+from ai import iterative_deepening, last_search, TranspositionTable, HARD_PLUS
+from bitboard import BitBoard
+from headless import ai_policy
+from parallel import SEARCH_WORKERS
+from profiling import profiler
+
+def _think_loop(jobs, results, current, workers):
+    # Thinker process: search each job until its budget runs out, reporting every finished
+    # depth, and drop jobs that were superseded. Tables and the pool live as long as the process
+    tables = {}
+    pool = None
+    if workers:
+        from parallel import ParallelSearch
+        pool = ParallelSearch(workers)
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        job_id, rows, cols, owners, powerup_bits, player_positions, player_idx, budget_ms = job
+        if current.value != job_id:
+            continue
+        if (rows, cols) not in tables:
+            tables[(rows, cols)] = TranspositionTable(rows, cols)
+        board, powerups = BitBoard(rows, cols, owners, powerup_bits).to_arrays()
+
+        def on_depth(move, val, depth):
+            results.put((job_id, move, depth, None))
+            return current.value != job_id
+
+        table = tables[(rows, cols)]
+        probes, hits = table.probes, table.hits
+        iterative_deepening(board, player_positions, rows, cols, player_idx, budget_ms, powerups,
+                            table=table, pool=pool, on_depth=on_depth)
+        # The finished message carries the search's numbers back for the game's profiler
+        results.put((job_id, None, 0, dict(last_search, tt_probes=table.probes - probes, tt_hits=table.hits - hits)))
+    if pool is not None:
+        pool.close()
+
+class Thinker:
+    # Background Hard+ search for one AI player in its own process, so it never holds up
+    # drawing or input. As soon as it has played a move it starts pondering the next one,
+    # so the search runs during the move delay and the opponent's moves
+    def __init__(self, workers=SEARCH_WORKERS):
+        self.jobs = multiprocessing.Queue()
+        self.results = multiprocessing.Queue()
+        self.current = multiprocessing.Value('i', 0, lock=False)
+        self.process = multiprocessing.Process(target=_think_loop, args=(self.jobs, self.results, self.current, workers))
+        self.process.start()
+        self.origin = None
+        self.started = 0.0
+        self.budget_ms = 0
+        self.best = None
+        self.depth = 0
+        self.done = False
+
+    def start(self, board, player_positions, rows, cols, player_idx, powerups, budget_ms):
+        # Supersedes any running job; the old one stops after its current depth
+        self.current.value += 1
+        bits = BitBoard.from_arrays(board, powerups)
+        self.origin = tuple(player_positions[player_idx])
+        self.started = time.perf_counter()
+        self.budget_ms = budget_ms
+        self.best, self.depth, self.done = None, 0, False
+        self.jobs.put((self.current.value, rows, cols, bits.owners, bits.powerups,
+                       [list(pos) for pos in player_positions], player_idx, budget_ms))
+
+    def _drain(self):
+        while True:
+            try:
+                job_id, move, depth, stats = self.results.get_nowait()
+            except queue.Empty:
+                return
+            if stats is not None and profiler.enabled:
+                profiler.record('search', stats['time_ms'])
+                profiler.count('searches')
+                profiler.count('search_depth_total', stats['depth'])
+                profiler.count('minimax_nodes', stats['nodes'])
+                profiler.count('tt_probes', stats['tt_probes'])
+                profiler.count('tt_hits', stats['tt_hits'])
+            if job_id != self.current.value:
+                continue
+            if stats is not None:
+                self.done = True
+            else:
+                self.best, self.depth = move, depth
+
+    def poll(self, pos, budget_ms=None):
+        # Finished move, or the best so far once the budget has run out; None to keep waiting.
+        # budget_ms is the player's move delay now, which is shorter than the job's own budget
+        # when the move it pondered after picked up a speed boost
+        self._drain()
+        if self.origin != tuple(pos) or self.best is None:
+            return None
+        budget_ms = self.budget_ms if budget_ms is None else min(budget_ms, self.budget_ms)
+        if self.done or (time.perf_counter() - self.started) * 1000 >= budget_ms:
+            return self.best
+        return None
+
+    def thinking_from(self, pos):
+        return self.origin == tuple(pos)
+
+    def close(self):
+        self.current.value += 1
+        self.jobs.put(None)
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.terminate()
+
+def async_policy(workers=SEARCH_WORKERS):
+    # Non-blocking stand-in for headless.match_policy: Hard+ moves come from a Thinker, and a
+    # player whose search isn't ready yet just skips this tick (engine.step asks again next tick)
+    thinkers = {}
+
+    def policy(state, player_idx):
+        if state.difficulty != HARD_PLUS:
+            return ai_policy(state, player_idx)
+        if player_idx not in thinkers:
+            thinkers[player_idx] = Thinker(workers)
+        thinker = thinkers[player_idx]
+        pos = state.player_positions[player_idx]
+        budget = state.move_delays()[player_idx]
+        moves = state.tables.moves4[pos[0] * state.cols + pos[1]]
+        # Powerups next to us beat any search, as in ai_move
+        move = next((list(m) for m in moves if state.powerups[m] != -1), None)
+        if move is None:
+            move = thinker.poll(pos, budget)
+        if move is None:
+            if not thinker.thinking_from(pos):
+                thinker.start(state.board, state.player_positions, state.rows, state.cols, player_idx, state.powerups, budget)
+            return None
+        # Ponder the next move from where this one lands while the move delay runs
+        board = state.board.copy()
+        board[move[0], move[1]] = player_idx
+        positions = [list(p) for p in state.player_positions]
+        positions[player_idx] = list(move)
+        thinker.start(board, positions, state.rows, state.cols, player_idx, state.powerups, budget)
+        return [list(move)]
+
+    def close():
+        for thinker in thinkers.values():
+            thinker.close()
+
+    policy.close = close
+    policy.thinkers = thinkers
+    return policy
@@ -0,0 +1,195 @@
+import argparse
+import time
+
+import numpy as np
+
+from engine import (
+    FREEZE, BONUS, SHIELD, SPEED_BOOST, TERRITORY_BOMB, DOUBLE_POINTS, POWERUP_TYPES,
+    BOARD_SIZES, TIMER_OPTIONS, MOVE_DELAY, POWERUP_SPAWN_INTERVAL, DIRECTIONS4, DIRECTIONS8
+)
+
+# Same move order as ai_move
+DIRECTIONS = np.array(DIRECTIONS4)
+BOMB_OFFSETS = np.array(DIRECTIONS8)
+# Effect slots in BatchGame.effect_end
+EFFECT_SLOTS = {SHIELD: 0, SPEED_BOOST: 1, DOUBLE_POINTS: 2}
+# Easy, Medium and Hard; Hard+ searches with minimax and has no batched version
+BATCH_DIFFICULTIES = [0, 1, 2]
+
+class BatchGame:
+    # N AI vs AI games of the same size and timer advanced in lockstep, one tick per call
+    def __init__(self, n, rows, cols, timer, seed=None):
+        self.n, self.rows, self.cols = n, rows, cols
+        self.timer = timer
+        self.rng = np.random.default_rng(seed)
+        self.games = np.arange(n)
+        self.board = np.full((n, rows, cols), -1, dtype=np.int8)
+        self.powerups = np.full((n, rows, cols), -1, dtype=np.int8)
+        self.positions = np.zeros((n, 2, 2), dtype=np.int64)
+        self.positions[:, 1] = (rows - 1, cols - 1)
+        self.board[:, 0, 0] = 0
+        self.board[:, rows - 1, cols - 1] = 1
+        self.scores = np.ones((n, 2), dtype=np.int64)
+        self.effect_end = np.zeros((n, 2, len(EFFECT_SLOTS)), dtype=np.int64)
+        self.freeze_end = np.zeros((n, 2), dtype=np.int64)
+        self.last_move = np.zeros((n, 2), dtype=np.int64)
+        self.spawn_timer = 0
+        self.now = 0
+        weights = np.array([POWERUP_TYPES[i]['spawn_weight'] for i in range(len(POWERUP_TYPES))], dtype=float)
+        self.spawn_cdf = np.cumsum(weights) / weights.sum()
+
+    @property
+    def over(self):
+        return self.now >= self.timer * 1000
+
+    def effect_active(self, powerup_type):
+        return self.effect_end[:, :, EFFECT_SLOTS[powerup_type]] > self.now
+
+    def tile_counts(self):
+        return np.stack([(self.board == 0).sum(axis=(1, 2)), (self.board == 1).sum(axis=(1, 2))], axis=1)
+
+    def winners(self):
+        counts = self.tile_counts()
+        return np.where(counts[:, 0] > counts[:, 1], 0, np.where(counts[:, 1] > counts[:, 0], 1, -1))
+
+    def neighbor_moves(self, player_idx):
+        # (N, 4, 2) candidate cells and (N, 4) in-bounds mask
+        cells = self.positions[:, player_idx, None, :] + DIRECTIONS[None, :, :]
+        valid = (cells[..., 0] >= 0) & (cells[..., 0] < self.rows) & (cells[..., 1] >= 0) & (cells[..., 1] < self.cols)
+        return cells, valid
+
+    def spawn_powerups(self):
+        # One powerup per game on a random empty cell, type drawn by spawn_weight
+        flat = self.powerups.reshape(self.n, -1)
+        keys = self.rng.random(flat.shape)
+        keys[flat != -1] = -1
+        cells = keys.argmax(axis=1)
+        has_room = keys[self.games, cells] >= 0
+        types = np.searchsorted(self.spawn_cdf, self.rng.random(self.n), side='right')
+        types = np.minimum(types, len(self.spawn_cdf) - 1)
+        flat[self.games[has_room], cells[has_room]] = types[has_room]
+
+    def _apply_powerups(self, games, player_idx, rows, cols):
+        now = self.now
+        ptype = self.powerups[games, rows, cols]
+        freeze = games[ptype == FREEZE]
+        self.freeze_end[freeze, 1 - player_idx] = np.maximum(self.freeze_end[freeze, 1 - player_idx], now) + POWERUP_TYPES[FREEZE]['duration'] * 1000
+        for powerup_type, slot in EFFECT_SLOTS.items():
+            hit = games[ptype == powerup_type]
+            self.effect_end[hit, player_idx, slot] = np.maximum(self.effect_end[hit, player_idx, slot], now) + POWERUP_TYPES[powerup_type]['duration'] * 1000
+        bonus = ptype == BONUS
+        if bonus.any():
+            bg, br, bc = games[bonus], rows[bonus], cols[bonus]
+            self.board[bg, br, bc] = player_idx
+            # First empty cell in row-major order, as in the scalar rules
+            flat = self.board.reshape(self.n, -1)
+            empty = flat[bg] == -1
+            first = empty.argmax(axis=1)
+            found = empty[np.arange(len(bg)), first]
+            flat[bg[found], first[found]] = player_idx
+        bomb = ptype == TERRITORY_BOMB
+        if bomb.any():
+            bg, br, bc = games[bomb], rows[bomb], cols[bomb]
+            for dr, dc in BOMB_OFFSETS:
+                nr, nc = br + dr, bc + dc
+                inside = (nr >= 0) & (nr < self.rows) & (nc >= 0) & (nc < self.cols)
+                self.board[bg[inside], nr[inside], nc[inside]] = player_idx
+        self.powerups[games, rows, cols] = -1
+
+    def _claim(self, games, player_idx, rows, cols):
+        owner = self.board[games, rows, cols].astype(np.int64)
+        shield = self.effect_active(SHIELD)
+        other = (owner != -1) & (owner != player_idx)
+        blocked = other & shield[games, np.clip(owner, 0, 1)]
+        take = (owner != player_idx) & ~blocked
+        tg, tr, tc = games[take], rows[take], cols[take]
+        self.board[tg, tr, tc] = player_idx
+        lost = other[take]
+        loser = owner[take][lost]
+        lg = tg[lost]
+        self.scores[lg, loser] -= (self.scores[lg, loser] > 0).astype(np.int64)
+        gain = np.where(self.effect_active(DOUBLE_POINTS)[tg, player_idx], 2, 1)
+        self.scores[tg, player_idx] += gain
+
+    def move_delays(self):
+        return np.where(self.effect_active(SPEED_BOOST), MOVE_DELAY // 7, MOVE_DELAY)
+
+    def next_event(self):
+        # Earliest time any player in the batch may move or a powerup spawns
+        due = np.maximum(self.last_move + self.move_delays(), self.freeze_end)
+        return min(int(due.min()), self.spawn_timer + POWERUP_SPAWN_INTERVAL + 1, self.timer * 1000)
+
+    def tick(self, policies):
+        # Jump every game to the next event. policies[p](game, p, movers) -> (len(movers), 2) targets
+        if self.over:
+            return
+        self.now = self.next_event()
+        if self.now - self.spawn_timer > POWERUP_SPAWN_INTERVAL:
+            self.spawn_powerups()
+            self.spawn_timer = self.now
+        delays = self.move_delays()
+        for player_idx in [0, 1]:
+            due = (self.now >= self.freeze_end[:, player_idx]) & (self.now - self.last_move[:, player_idx] >= delays[:, player_idx])
+            movers = self.games[due]
+            if not len(movers):
+                continue
+            targets = np.asarray(policies[player_idx](self, player_idx, movers))
+            rows, cols = targets[:, 0], targets[:, 1]
+            inside = (rows >= 0) & (rows < self.rows) & (cols >= 0) & (cols < self.cols)
+            movers, rows, cols = movers[inside], rows[inside], cols[inside]
+            self._apply_powerups(movers, player_idx, rows, cols)
+            self._claim(movers, player_idx, rows, cols)
+            self.positions[movers, player_idx] = targets[inside]
+            self.last_move[movers, player_idx] = self.now
+
+    def run(self, policies):
+        while not self.over:
+            self.tick(policies)
+        return self
+
+def _random_pick(rng, mask):
+    # Index of a uniformly random True entry per row (rows must have one)
+    keys = rng.random(mask.shape)
+    keys[~mask] = -1
+    return keys.argmax(axis=1)
+
+def batch_ai_policy(difficulty):
+    # Vectorized ai_move: adjacent powerup first, then difficulty-weighted preference for unowned tiles
+    if difficulty not in BATCH_DIFFICULTIES:
+        raise ValueError(f"no batched policy for difficulty {difficulty}; choose from {BATCH_DIFFICULTIES}")
+    smartness = 0.7 if difficulty == 1 else 0.9
+
+    def policy(game, player_idx, movers):
+        cells, valid = game.neighbor_moves(player_idx)
+        cells, valid = cells[movers], valid[movers]
+        rows, cols = np.clip(cells[..., 0], 0, game.rows - 1), np.clip(cells[..., 1], 0, game.cols - 1)
+        g = movers[:, None]
+        choice = _random_pick(game.rng, valid)
+        if difficulty != 0:
+            good = valid & (game.board[g, rows, cols] != player_idx)
+            smart = good.any(axis=1) & (game.rng.random(len(movers)) < smartness)
+            choice = np.where(smart, _random_pick(game.rng, good), choice)
+        has_powerup = valid & (game.powerups[g, rows, cols] != -1)
+        choice = np.where(has_powerup.any(axis=1), has_powerup.argmax(axis=1), choice)
+        return cells[np.arange(len(movers)), choice]
+
+    return policy
+
+def main():
+    parser = argparse.ArgumentParser(description='Run many AI vs AI games at once as NumPy arrays')
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--size', type=int, default=BOARD_SIZES[-1])
+    parser.add_argument('--timer', type=int, default=TIMER_OPTIONS[0])
+    parser.add_argument('--difficulty', type=int, nargs=2, choices=BATCH_DIFFICULTIES, default=[2, 2])
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    start = time.perf_counter()
+    game = BatchGame(args.games, args.size, args.size, args.timer, seed=args.seed)
+    game.run([batch_ai_policy(args.difficulty[0]), batch_ai_policy(args.difficulty[1])])
+    elapsed = time.perf_counter() - start
+    winners = game.winners()
+    print(f"{args.games} games in {elapsed:.2f}s ({args.games / elapsed:.1f} games/s)")
+    print(f"Player 1 wins: {np.sum(winners == 0)}  Player 2 wins: {np.sum(winners == 1)}  Ties: {np.sum(winners == -1)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+import argparse
+import json
+import os
+import platform
+import random
+import time
+
+import numpy as np
+
+from engine import GameState, FreeCells, step, spawn_powerup, BOARD_SIZES, DIFFICULTY_OPTIONS, MOVE_DELAY
+from ai import heuristic, ai_move, fixed_depth_search, last_search, Evaluator, SEARCH_TIME_FRACTION, HARD_PLUS
+from features import extract
+from headless import SimulatedClock, ai_policy
+
+# Fixtures are mid-game positions: a seeded Medium vs Medium game stopped once this much of the board is owned
+FIXTURE_FILL = 0.4
+# Fixed search depths; every size branches at most four ways, so the same depths fit all
+MINIMAX_DEPTHS = [6, 8, 10]
+DEFAULT_OUTPUT = 'bench_results.json'
+
+def fixture(size, seed):
+    random.seed(seed * 1000 + size)
+    state = GameState.from_settings({'size': size, 'timer': 60, 'difficulty': 1, 'mode': 'AI vs AI'}, now_ms=0)
+    clock = SimulatedClock()
+    while not state.over and np.mean(state.board != -1) < FIXTURE_FILL:
+        step(state, [ai_policy, ai_policy], clock())
+    return state
+
+def time_calls(fn, calls):
+    # Per-call wall time in ms
+    times = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return np.array(times)
+
+def latency(times):
+    p50, p95, p99 = np.percentile(times, [50, 95, 99])
+    return {'calls': len(times), 'mean_ms': float(times.mean()), 'p50_ms': float(p50), 'p95_ms': float(p95), 'p99_ms': float(p99), 'max_ms': float(times.max())}
+
+def bench_minimax(state, depth, repeats):
+    # Median of a few identical searches; node count and move don't change between them
+    times = []
+    for _ in range(repeats):
+        move, val = fixed_depth_search(state.board.copy(), [list(pos) for pos in state.player_positions], state.rows, state.cols, 0, depth, state.powerups.copy())
+        times.append(last_search['time_ms'])
+    nodes, ms = last_search['nodes'], float(np.median(times))
+    return {'depth': depth, 'nodes': nodes, 'time_ms': ms, 'nodes_per_sec': nodes / ms * 1000 if ms else 0.0, 'move': list(move)}
+
+def bench_rate(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    elapsed = time.perf_counter() - start
+    return {'calls': calls, 'calls_per_sec': calls / elapsed}
+
+def bench_features(state, batch, calls):
+    # Vectorized feature extraction over a batch of copies of the fixture
+    boards = np.repeat(state.board[None], batch, axis=0)
+    powerups = np.repeat(state.powerups[None], batch, axis=0)
+    positions = [state.player_positions] * batch
+    result = bench_rate(lambda: extract(boards, positions, powerups, 0), calls)
+    return dict(result, batch=batch, boards_per_sec=result['calls_per_sec'] * batch)
+
+def bench_ai_move(state, difficulty, calls, seed):
+    random.seed(seed)
+    budget = MOVE_DELAY * SEARCH_TIME_FRACTION if difficulty == HARD_PLUS else None
+    pos = state.player_positions[0]
+    depths = []
+
+    def move():
+        ai_move(state.board, pos, state.rows, state.cols, difficulty, 0, state.player_positions, state.mode, state.powerups, budget)
+        depths.append(last_search['depth'])
+
+    result = dict(latency(time_calls(move, calls)), budget_ms=budget)
+    if difficulty == HARD_PLUS:
+        # Latency is pinned to the budget, so how deep it got is the number to watch
+        result['mean_depth'] = float(np.mean(depths))
+    return result
+
+def bench_spawn(state, calls, seed):
+    random.seed(seed)
+    base = state.powerups
+    powerups = base.copy()
+    times = []
+    for i in range(calls):
+        # Keep the board from filling up with powerups
+        if i % 8 == 0:
+            powerups[:] = base
+            free_cells = FreeCells(powerups)
+        start = time.perf_counter()
+        spawn_powerup(powerups, free_cells)
+        times.append((time.perf_counter() - start) * 1000)
+    return latency(np.array(times))
+
+def bench_render(states, calls):
+    # Offscreen through SDL's dummy driver; imported here so the other benchmarks never load pygame
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import territory
+    territory.init_display()
+    results = []
+    colors = territory.PLAYER_COLORS
+    for size, state in states.items():
+        draw = lambda: territory.draw_board(state.board, state.powerups, None, state.player_positions, state.rows, state.cols, colors)
+        draw()
+        results.append(dict(latency(time_calls(draw, calls)), bench='draw_board', size=size))
+    return results
+
+def run(sizes, seed, quick, render):
+    scale = 1 if quick else 5
+    states = {size: fixture(size, seed) for size in sizes}
+    results = []
+    for size, state in states.items():
+        print(f"size {size}: {int(np.sum(state.board != -1))} owned cells")
+        for depth in MINIMAX_DEPTHS[:2] if quick else MINIMAX_DEPTHS:
+            results.append(dict(bench_minimax(state, depth, 3 if quick else 5), bench='minimax', size=size))
+        results.append(dict(bench_rate(lambda: heuristic(state.board, 0, state.rows, state.cols, state.player_positions), 2000 * scale), bench='heuristic', size=size))
+        evaluator = Evaluator(state.board, state.rows, state.cols)
+        results.append(dict(bench_rate(lambda: evaluator.evaluate(0, state.player_positions), 20000 * scale), bench='evaluator', size=size))
+        results.append(dict(bench_features(state, 256, 20 * scale), bench='features', size=size))
+        for difficulty, name in enumerate(DIFFICULTY_OPTIONS):
+            calls = (4 if quick else 20) if difficulty == HARD_PLUS else 200 * scale
+            results.append(dict(bench_ai_move(state, difficulty, calls, seed), bench='ai_move', size=size, difficulty=name))
+        results.append(dict(bench_spawn(state, 500 * scale, seed), bench='spawn_powerup', size=size))
+    if render:
+        results.extend(bench_render(states, 20 * scale))
+    return results
+
+def summary_line(result):
+    if 'nodes_per_sec' in result:
+        return f"{result['nodes_per_sec']:>12,.0f} nodes/s  depth {result['depth']} ({result['nodes']} nodes)"
+    if 'boards_per_sec' in result:
+        return f"{result['boards_per_sec']:>12,.0f} boards/s  batch {result['batch']}"
+    if 'calls_per_sec' in result:
+        return f"{result['calls_per_sec']:>12,.0f} calls/s"
+    line = f"p50 {result['p50_ms']:.3f}  p95 {result['p95_ms']:.3f}  p99 {result['p99_ms']:.3f} ms"
+    if 'mean_depth' in result:
+        line += f"  depth {result['mean_depth']:.1f}"
+    return line
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark search, evaluation, rules and rendering on fixed positions')
+    parser.add_argument('--sizes', type=int, nargs='+', default=BOARD_SIZES)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--quick', action='store_true', help='fewer calls and shallower searches')
+    parser.add_argument('--no-render', dest='render', action='store_false', help='skip draw_board (needs pygame)')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='JSON results file')
+    args = parser.parse_args()
+    start = time.perf_counter()
+    results = run(args.sizes, args.seed, args.quick, args.render)
+    for result in results:
+        label = f"{result['bench']:<14} size {result['size']:>2} {result.get('difficulty', ''):<7}"
+        print(f"{label} {summary_line(result)}")
+    report = {
+        'seed': args.seed,
+        'quick': args.quick,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'elapsed_s': time.perf_counter() - start,
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+import numpy as np
+from functools import lru_cache
+
+from engine import POWERUP_TYPES, board_tables
+
+def _to_bits(mask):
+    # Bool array -> int with bit row*cols + col set for every True cell
+    return int.from_bytes(np.packbits(mask.ravel(), bitorder='little').tobytes(), 'little')
+
+def _from_bits(bits, cells):
+    raw = np.frombuffer(bits.to_bytes((cells + 7) // 8, 'little'), dtype=np.uint8)
+    return np.unpackbits(raw, bitorder='little')[:cells].astype(bool)
+
+@lru_cache(maxsize=None)
+def blast_masks(rows, cols):
+    # TERRITORY_BOMB neighborhood of every cell as a bit mask
+    return [sum(1 << (r * cols + c) for r, c in cells) for cells in board_tables(rows, cols).around8]
+
+class BitBoard:
+    # Board and powerup grids as Python ints: one bit per cell, bit index row*cols + col.
+    # Copying or hashing one is a handful of ints instead of two rows x cols int64 arrays
+    __slots__ = ('rows', 'cols', 'full_mask', 'owners', 'powerups')
+
+    def __init__(self, rows, cols, owners=(0, 0), powerups=None):
+        self.rows, self.cols = rows, cols
+        self.full_mask = (1 << (rows * cols)) - 1
+        self.owners = list(owners)
+        self.powerups = list(powerups) if powerups is not None else [0] * len(POWERUP_TYPES)
+
+    @classmethod
+    def from_arrays(cls, board, powerups=None):
+        rows, cols = board.shape
+        owners = [_to_bits(board == 0), _to_bits(board == 1)]
+        types = [_to_bits(powerups == t) for t in range(len(POWERUP_TYPES))] if powerups is not None else None
+        return cls(rows, cols, owners, types)
+
+    def to_arrays(self):
+        cells = self.rows * self.cols
+        board = np.full(cells, -1)
+        powerups = np.full(cells, -1)
+        for player in [0, 1]:
+            board[_from_bits(self.owners[player], cells)] = player
+        for powerup_type, bits in enumerate(self.powerups):
+            powerups[_from_bits(bits, cells)] = powerup_type
+        return board.reshape(self.rows, self.cols), powerups.reshape(self.rows, self.cols)
+
+    def key(self):
+        return (self.owners[0], self.owners[1], *self.powerups)
+
+    def copy(self):
+        clone = BitBoard.__new__(BitBoard)
+        clone.rows, clone.cols, clone.full_mask = self.rows, self.cols, self.full_mask
+        clone.owners = self.owners[:]
+        clone.powerups = self.powerups[:]
+        return clone
+
+    def owner(self, row, col):
+        bit = 1 << (row * self.cols + col)
+        return 0 if self.owners[0] & bit else 1 if self.owners[1] & bit else -1
+
+    def powerup(self, row, col):
+        bit = 1 << (row * self.cols + col)
+        for powerup_type, bits in enumerate(self.powerups):
+            if bits & bit:
+                return powerup_type
+        return -1
+
+    def claim(self, player, row, col):
+        bit = 1 << (row * self.cols + col)
+        self.owners[player] |= bit
+        self.owners[1 - player] &= ~bit
+
+    def bomb(self, player, row, col):
+        mask = blast_masks(self.rows, self.cols)[row * self.cols + col]
+        self.owners[player] |= mask
+        self.owners[1 - player] &= ~mask
+
+    def place_powerup(self, powerup_type, row, col):
+        self.powerups[powerup_type] |= 1 << (row * self.cols + col)
+
+    def take_powerup(self, row, col):
+        bit = 1 << (row * self.cols + col)
+        for powerup_type, bits in enumerate(self.powerups):
+            if bits & bit:
+                self.powerups[powerup_type] &= ~bit
+                return powerup_type
+        return -1
+
+    def empty(self):
+        return self.full_mask & ~(self.owners[0] | self.owners[1])
+
+    def first_empty(self):
+        # Lowest empty bit is the first empty cell in row-major order, as the BONUS rule scans
+        empty = self.empty()
+        if not empty:
+            return None
+        cell = (empty & -empty).bit_length() - 1
+        return divmod(cell, self.cols)
+
+    def count(self, player):
+        return self.owners[player].bit_count()
+
+    def is_full(self):
+        return not self.empty()
@@ -0,0 +1,343 @@
+import numpy as np
+import random
+from functools import lru_cache
+
+# Board defaults
+ROWS, COLS = 14, 14
+
+# Power-up types and their properties
+FREEZE = 0
+BONUS = 1
+SHIELD = 2
+SPEED_BOOST = 3
+TERRITORY_BOMB = 4
+DOUBLE_POINTS = 5
+
+POWERUP_TYPES = {
+    FREEZE: {
+        'color': (0, 255, 0),
+        'duration': 5,  # seconds
+        'spawn_weight': 1
+    },
+    BONUS: {
+        'color': (255, 255, 0),
+        'duration': 1,
+        'spawn_weight': 1
+    },
+    SHIELD: {
+        'color': (0, 0, 255),
+        'duration': 5,  # seconds
+        'spawn_weight': 1
+    },
+    SPEED_BOOST: {
+        'color': (255, 0, 0),
+        'duration': 5,  # seconds
+        'spawn_weight': 1
+    },
+    TERRITORY_BOMB: {
+        'color': (255, 165, 0),
+        'duration': 1,
+        'spawn_weight': 1
+    },
+    DOUBLE_POINTS: {
+        'color': (0, 255, 128),
+        'duration': 5,  # seconds
+        'spawn_weight': 1
+    }
+}
+
+ANIMATION_FRAMES = 10
+
+# Game settings options
+BOARD_SIZES = [8, 10, 12, 14]
+TIMER_OPTIONS = [10, 60, 90, 120]
+DIFFICULTY_OPTIONS = ["Easy", "Medium", "Hard", "Hard+"]
+
+# Timing (milliseconds)
+MOVE_DELAY = 500
+POWERUP_SPAWN_INTERVAL = 5000
+
+# Spawn draws: powerup ids with cumulative spawn weights, for random.choices
+POWERUP_IDS = list(POWERUP_TYPES)
+SPAWN_CUM_WEIGHTS = list(np.cumsum([POWERUP_TYPES[i]['spawn_weight'] for i in POWERUP_IDS]))
+
+# Powerups whose effect lasts for a while, keyed by their effect name
+TIMED_EFFECTS = {SHIELD: 'shield', SPEED_BOOST: 'speed_boost', DOUBLE_POINTS: 'double_points'}
+
+# Move directions in the order the AI tries them, and the bomb's blast neighborhood
+DIRECTIONS4 = [(-1,0),(1,0),(0,-1),(0,1)]
+DIRECTIONS8 = [(-1,0), (1,0), (0,-1), (0,1), (-1,-1), (-1,1), (1,-1), (1,1)]
+
+class BoardTables:
+    # In-bounds neighbors of every cell for one board size, indexed by row*cols + col
+    def __init__(self, rows, cols):
+        self.rows, self.cols = rows, cols
+        cells = [(r, c) for r in range(rows) for c in range(cols)]
+        self.moves4 = [self._around(r, c, DIRECTIONS4) for r, c in cells]
+        self.around8 = [self._around(r, c, DIRECTIONS8) for r, c in cells]
+        # paths[distance][cell][delta]: cells walked by a move of 1 or 2 (speed boost) steps
+        self.paths = {d: [self._paths(r, c, d) for r, c in cells] for d in (1, 2)}
+
+    def _around(self, r, c, directions):
+        return tuple((r+dr, c+dc) for dr, dc in directions if 0 <= r+dr < self.rows and 0 <= c+dc < self.cols)
+
+    def _paths(self, r, c, distance):
+        paths = {}
+        for dr, dc in DIRECTIONS4:
+            path = tuple((r + dr * k, c + dc * k) for k in range(1, distance + 1))
+            if all(0 <= pr < self.rows and 0 <= pc < self.cols for pr, pc in path):
+                paths[(dr, dc)] = path
+        return paths
+
+@lru_cache(maxsize=None)
+def board_tables(rows, cols):
+    return BoardTables(rows, cols)
+
+class FreeCells:
+    # Cells with no powerup on them (flat row*cols + col), kept as an array with swap-remove
+    # plus each cell's slot in it, so spawning and pickups never rescan the grid
+    def __init__(self, powerups):
+        self.cols = powerups.shape[1]
+        self.cells = np.flatnonzero(powerups.ravel() == -1).tolist()
+        self.slot = [-1] * powerups.size
+        for i, cell in enumerate(self.cells):
+            self.slot[cell] = i
+
+    def __len__(self):
+        return len(self.cells)
+
+    def add(self, row, col):
+        cell = row * self.cols + col
+        if self.slot[cell] == -1:
+            self.slot[cell] = len(self.cells)
+            self.cells.append(cell)
+
+    def remove(self, row, col):
+        cell = row * self.cols + col
+        i = self.slot[cell]
+        if i == -1:
+            return
+        last = self.cells.pop()
+        if last != cell:
+            self.cells[i] = last
+            self.slot[last] = i
+        self.slot[cell] = -1
+
+def spawn_powerup(powerups, free_cells=None, rng=random):
+    # Without an index the free cells are found by a scan, in row-major order as before
+    if free_cells is None:
+        free_cells = FreeCells(powerups)
+    if free_cells:
+        row, col = divmod(rng.choice(free_cells.cells), free_cells.cols)
+        # Weighted random choice based on spawn_weight
+        powerup_type = rng.choices(POWERUP_IDS, cum_weights=SPAWN_CUM_WEIGHTS)[0]
+        powerups[row, col] = powerup_type
+        free_cells.remove(row, col)
+        return row, col, powerup_type
+    return None
+
+def spawn_powerups(powerups, count, free_cells=None, rng=random):
+    # Bulk version of spawn_powerup: count distinct free cells (fewer if the board runs out)
+    if free_cells is None:
+        free_cells = FreeCells(powerups)
+    cells = rng.sample(free_cells.cells, min(count, len(free_cells)))
+    types = rng.choices(POWERUP_IDS, cum_weights=SPAWN_CUM_WEIGHTS, k=len(cells))
+    for cell, powerup_type in zip(cells, types):
+        row, col = divmod(cell, free_cells.cols)
+        powerups[row, col] = powerup_type
+        free_cells.remove(row, col)
+
+def first_empty(board, start=0):
+    # First unclaimed cell in row-major order at or after flat index start, as (row, col)
+    empty = np.flatnonzero(board.ravel()[start:] == -1)
+    return divmod(start + int(empty[0]), board.shape[1]) if empty.size else None
+
+def claim_tile(board, powerups, animations, row, col, player, speed):
+    board[row, col] = player
+    animations[row, col] = ANIMATION_FRAMES
+    if powerups[row, col] != -1:
+        if powerups[row, col] == FREEZE:
+            speed = 0.5  # Slow down AI
+        elif powerups[row, col] == BONUS:
+            # Claim an extra tile if possible
+            cell = first_empty(board)
+            if cell is not None:
+                board[cell] = player
+                animations[cell] = ANIMATION_FRAMES
+        powerups[row, col] = -1
+    return speed
+
+def check_game_over(board):
+    # Accepts the ndarray board or a bitboard.BitBoard
+    if hasattr(board, 'is_full'):
+        return board.is_full()
+    return np.all(board != -1)
+
+def rng_streams(seed, players=2):
+    # One random.Random for the rules and one per player, all derived from the game seed, so a
+    # player's draws never shift the spawns or the other player's draws
+    root = random.Random(seed)
+    return random.Random(root.getrandbits(64)), [random.Random(root.getrandbits(64)) for _ in range(players)]
+
+class GameState:
+    # Everything main()'s game loop used to keep in locals, without any pygame objects.
+    # seed fixes every random draw of the game; None takes one from the global random module
+    def __init__(self, rows, cols, timer, player_types=("AI", "AI"), difficulty=0, mode="AI vs AI", now_ms=0, seed=None):
+        self.rows, self.cols = rows, cols
+        self.seed = random.getrandbits(32) if seed is None else seed
+        self.rng, self.player_rngs = rng_streams(self.seed)
+        self.tables = board_tables(rows, cols)
+        self.timer = timer
+        self.player_types = list(player_types)
+        self.difficulty = difficulty
+        self.mode = mode
+        self.player_positions = [list((0, 0)), list((rows-1, cols-1))]
+        self.board = np.full((rows, cols), -1)
+        self.board[self.player_positions[0][0], self.player_positions[0][1]] = 0
+        self.board[self.player_positions[1][0], self.player_positions[1][1]] = 1
+        self.scores = [1, 1]  # Each player starts with 1 tile
+        self.powerups = np.full((rows, cols), -1)
+        self.free_cells = FreeCells(self.powerups)
+        # Claimed cells never go back to empty, so the first empty cell only moves forward;
+        # BONUS resumes the search from here
+        self.empty_cursor = 0
+        self.powerup_end_times = {0: {}, 1: {}}
+        self.powerup_effects = {
+            0: {'shield': False, 'speed_boost': False, 'double_points': False},
+            1: {'shield': False, 'speed_boost': False, 'double_points': False}
+        }
+        self.freeze_end_time = {0: 0, 1: 0}
+        self.last_move_time = {0: 0, 1: 0}
+        self.start_ticks = now_ms
+        self.powerup_spawn_timer = now_ms
+        self.time_left = timer
+        self.over = False
+        # Optional replay.Recorder; step reports every spawn and move to it
+        self.recorder = None
+
+    @classmethod
+    def from_settings(cls, settings, now_ms=0):
+        size = settings['size']
+        mode = settings.get('mode', "AI vs AI")
+        player_types = ["AI", "AI"] if mode == "AI vs AI" else ["Human", "AI"]
+        return cls(size, size, settings['timer'], player_types, settings.get('difficulty', 0), mode, now_ms, settings.get('seed'))
+
+    def move_delays(self):
+        # Speed boost cuts the move delay to a seventh
+        return [MOVE_DELAY // 7 if self.powerup_effects[p]['speed_boost'] else MOVE_DELAY for p in [0, 1]]
+
+    def final_scores(self):
+        return [int(np.sum(self.board == 0)), int(np.sum(self.board == 1))]
+
+    def winner(self):
+        scores = self.final_scores()
+        return 0 if scores[0] > scores[1] else 1 if scores[1] > scores[0] else -1
+
+def _extend_timer(end_times, key, now_ms, duration):
+    # Picking up an effect that's still running stacks its duration
+    prev_end = end_times.get(key, 0)
+    if prev_end > now_ms:
+        end_times[key] = prev_end + duration * 1000
+    else:
+        end_times[key] = now_ms + duration * 1000
+
+def next_empty(state):
+    # First empty cell via GameState.empty_cursor; amortized O(1) per call over a game
+    flat = state.board.ravel()
+    cursor = state.empty_cursor
+    while cursor < flat.size and flat[cursor] != -1:
+        cursor += 1
+    state.empty_cursor = cursor
+    return divmod(cursor, state.cols) if cursor < flat.size else None
+
+def apply_powerup(state, player_idx, row, col, now_ms):
+    powerup_type = state.powerups[row, col]
+    if powerup_type == -1:
+        return
+    board = state.board
+    if powerup_type == FREEZE:
+        _extend_timer(state.freeze_end_time, 1 - player_idx, now_ms, POWERUP_TYPES[FREEZE]['duration'])
+    elif powerup_type == BONUS:
+        board[row, col] = player_idx
+        cell = next_empty(state)
+        if cell is not None:
+            board[cell] = player_idx
+    elif powerup_type in TIMED_EFFECTS:
+        effect = TIMED_EFFECTS[powerup_type]
+        state.powerup_effects[player_idx][effect] = True
+        _extend_timer(state.powerup_end_times[player_idx], effect, now_ms, POWERUP_TYPES[powerup_type]['duration'])
+    elif powerup_type == TERRITORY_BOMB:
+        for nr, nc in state.tables.around8[row * state.cols + col]:
+            board[nr, nc] = player_idx
+    state.powerups[row, col] = -1
+    state.free_cells.add(row, col)
+
+def enter_tile(state, player_idx, row, col, now_ms):
+    apply_powerup(state, player_idx, row, col, now_ms)
+    # Score only increases if a new tile is claimed (not if moving onto own tile)
+    cell_owner = state.board[row, col]
+    if not (cell_owner != -1 and state.powerup_effects[cell_owner]['shield'] and cell_owner != player_idx):
+        if cell_owner != player_idx:
+            state.board[row, col] = player_idx
+            if cell_owner != -1 and state.scores[cell_owner] > 0:
+                state.scores[cell_owner] -= 1
+            state.scores[player_idx] += 2 if state.powerup_effects[player_idx]['double_points'] else 1
+
+def human_path(state, player_idx, delta):
+    # Cells walked by a keypress; speed boost moves two cells. None if it would leave the board
+    move_distance = 2 if state.powerup_effects[player_idx]['speed_boost'] else 1
+    pos = state.player_positions[player_idx]
+    path = state.tables.paths[move_distance][pos[0] * state.cols + pos[1]].get(tuple(delta))
+    return [list(cell) for cell in path] if path else None
+
+def is_due(state, player_idx, now_ms):
+    if now_ms < state.freeze_end_time[player_idx]:
+        return False
+    if state.player_types[player_idx] != "AI":
+        return True
+    return now_ms - state.last_move_time[player_idx] >= state.move_delays()[player_idx]
+
+def update_clock(state, now_ms):
+    # Time left and effect expiry at now_ms
+    state.time_left = max(0, state.timer - (now_ms - state.start_ticks)//1000)
+    # Update powerup effects based on current time and end times
+    for player in [0, 1]:
+        for effect in TIMED_EFFECTS.values():
+            if now_ms >= state.powerup_end_times[player].get(effect, 0):
+                state.powerup_effects[player][effect] = False
+
+def move_player(state, player_idx, path, now_ms):
+    for row, col in path:
+        enter_tile(state, player_idx, row, col, now_ms)
+        state.player_positions[player_idx] = [row, col]
+    if state.player_types[player_idx] == "AI":
+        state.last_move_time[player_idx] = now_ms
+
+def step(state, actions, now_ms):
+    # Advance the game to now_ms. actions[i] is None, a path (list of cells) or a
+    # callable (state, i) -> path, which is only called when player i may move.
+    spawned = None
+    if now_ms - state.powerup_spawn_timer > POWERUP_SPAWN_INTERVAL:
+        spawned = spawn_powerup(state.powerups, state.free_cells, state.rng)
+        state.powerup_spawn_timer = now_ms
+
+    update_clock(state, now_ms)
+
+    # AI players move first, in player order, then humans
+    moves = []
+    for player_idx in sorted([0, 1], key=lambda p: state.player_types[p] != "AI"):
+        action = actions[player_idx]
+        if action is None or not is_due(state, player_idx, now_ms):
+            continue
+        path = action(state, player_idx) if callable(action) else action
+        # Ensure the new position is valid
+        if not path or not all(0 <= row < state.rows and 0 <= col < state.cols for row, col in path):
+            continue
+        move_player(state, player_idx, path, now_ms)
+        moves.append((player_idx, path))
+
+    if state.time_left <= 0:
+        state.over = True
+    if state.recorder is not None:
+        state.recorder.record(state, now_ms, spawned, moves)
+    return state
@@ -0,0 +1,109 @@
+import numpy as np
+
+# Evaluation features for one board (rows, cols) or a batch (n, rows, cols), all as NumPy array
+# ops. The first five are the terms of ai.heuristic(), so extract() @ weight_vector() is the same
+# value for the same weights; 'region' is the size of the player's largest connected group of tiles
+FEATURES = ['tiles', 'mobility', 'center', 'powerup', 'frontier', 'region']
+
+def neighbor_count(mask):
+    # How many of each cell's 4-neighbors are True, by adding shifted copies
+    mask = np.asarray(mask, dtype=np.int8)
+    count = np.zeros(mask.shape, dtype=np.int8)
+    count[..., 1:, :] += mask[..., :-1, :]
+    count[..., :-1, :] += mask[..., 1:, :]
+    count[..., :, 1:] += mask[..., :, :-1]
+    count[..., :, :-1] += mask[..., :, 1:]
+    return count
+
+def frontier_mask(board, player):
+    # Owned tiles with a 4-neighbor the player doesn't own
+    own = np.asarray(board) == player
+    return own & (neighbor_count(own) < neighbor_count(np.ones(own.shape[-2:], dtype=bool)))
+
+def frontier_size(board, player):
+    size = frontier_mask(board, player).sum(axis=(-2, -1))
+    return int(size) if np.ndim(size) == 0 else size
+
+def distance_transform(mask):
+    # Manhattan distance from every cell to the nearest True cell, rows + cols where there is
+    # none. Moves are 4-way with nothing in the way, so that is the step count. Manhattan distance
+    # splits by axis: a forward and a backward pass along the columns, then along the rows
+    mask = np.asarray(mask, dtype=bool)
+    rows, cols = mask.shape[-2:]
+    dist = np.where(mask, 0, rows + cols).astype(np.int32)
+    for c in range(1, cols):
+        np.minimum(dist[..., c], dist[..., c - 1] + 1, out=dist[..., c])
+    for c in range(cols - 2, -1, -1):
+        np.minimum(dist[..., c], dist[..., c + 1] + 1, out=dist[..., c])
+    for r in range(1, rows):
+        np.minimum(dist[..., r, :], dist[..., r - 1, :] + 1, out=dist[..., r, :])
+    for r in range(rows - 2, -1, -1):
+        np.minimum(dist[..., r, :], dist[..., r + 1, :] + 1, out=dist[..., r, :])
+    return dist
+
+def powerup_distance(powerups):
+    # Distance to the nearest powerup; all zeros on a board without any, like ai.heuristic()
+    has_powerup = np.asarray(powerups) != -1
+    dist = distance_transform(has_powerup)
+    return np.where(has_powerup.any(axis=(-2, -1), keepdims=True), dist, 0)
+
+def label_regions(mask):
+    # 4-connected regions of mask without scipy: every cell starts with its own label (flat index
+    # + 1, so labels are unique across a batch) and takes the smallest label among its neighbors
+    # until nothing changes. After each round a label jumps to the label of the cell it names,
+    # which cuts the rounds from the region's length to about its log. 0 outside the mask
+    mask = np.asarray(mask, dtype=bool)
+    none = mask.size + 1
+    labels = np.where(mask, np.arange(1, mask.size + 1).reshape(mask.shape), 0)
+    while True:
+        current = np.where(mask, labels, none)
+        best = current.copy()
+        np.minimum(best[..., 1:, :], current[..., :-1, :], out=best[..., 1:, :])
+        np.minimum(best[..., :-1, :], current[..., 1:, :], out=best[..., :-1, :])
+        np.minimum(best[..., :, 1:], current[..., :, :-1], out=best[..., :, 1:])
+        np.minimum(best[..., :, :-1], current[..., :, 1:], out=best[..., :, :-1])
+        best = np.where(mask, best, 0)
+        flat = best.ravel()
+        jumped = np.where(flat > 0, flat[np.maximum(flat - 1, 0)], 0).reshape(mask.shape)
+        if np.array_equal(jumped, labels):
+            return labels
+        labels = jumped
+
+def region_sizes(mask):
+    # Size of the region each cell belongs to, 0 outside the mask
+    labels = label_regions(mask)
+    sizes = np.bincount(labels.ravel(), minlength=labels.size + 1)
+    sizes[0] = 0
+    return sizes[labels]
+
+def largest_region(board, player):
+    size = region_sizes(np.asarray(board) == player).max(axis=(-2, -1))
+    return int(size) if np.ndim(size) == 0 else size
+
+def extract(board, player_positions, powerups, player):
+    # FEATURES for player, shape (len(FEATURES),) for one board or (n, len(FEATURES)) for a batch;
+    # player_positions is [[row, col], [row, col]] per board, as in GameState and batch.BatchGame
+    board = np.asarray(board)
+    single = board.ndim == 2
+    if single:
+        board, powerups, player_positions = board[None], np.asarray(powerups)[None], [player_positions]
+    rows, cols = board.shape[-2:]
+    positions = np.asarray(player_positions)[:, player]
+    r, c = positions[:, 0], positions[:, 1]
+    games = np.arange(len(board))
+    features = np.empty((len(board), len(FEATURES)))
+    features[:, 0] = (board == player).sum(axis=(1, 2))
+    features[:, 1] = (r > 0).astype(int) + (r < rows - 1) + (c > 0) + (c < cols - 1)
+    features[:, 2] = np.abs(r - rows//2) + np.abs(c - cols//2)
+    features[:, 3] = powerup_distance(powerups)[games, r, c]
+    features[:, 4] = frontier_size(board, player)
+    features[:, 5] = largest_region(board, player)
+    return features[0] if single else features
+
+def weight_vector(weights):
+    # A weights dict (ai.DEFAULT_WEIGHTS keys, optionally 'region') in FEATURES order
+    return np.array([weights.get(name, 0.0) for name in FEATURES])
+
+def evaluate(board, player_positions, powerups, player, weights):
+    # Leaf values for one board or a batch: ai.heuristic() with the same weights, plus 'region'
+    return extract(board, player_positions, powerups, player) @ weight_vector(weights)
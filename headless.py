@@ -0,0 +1,104 @@
+import argparse
+import os
+import time
+
+from engine import GameState, step, BOARD_SIZES, TIMER_OPTIONS
+from ai import ai_move, TranspositionTable, SEARCH_TIME_FRACTION, HARD_PLUS
+from parallel import ParallelSearch, SEARCH_WORKERS
+from profiling import profiler, PROFILE_PATH
+from replay import Recorder
+
+# Simulated tick length; the UI runs at 60 FPS so this matches one frame
+TICK_MS = 16
+
+class SimulatedClock:
+    # Injectable clock for headless runs: every call advances time by one tick
+    def __init__(self, tick_ms=TICK_MS, start_ms=0):
+        self.tick_ms = tick_ms
+        self.now_ms = start_ms
+
+    def __call__(self):
+        now = self.now_ms
+        self.now_ms += self.tick_ms
+        return now
+
+def ai_policy(state, player_idx, table=None, pool=None):
+    pos = state.player_positions[player_idx]
+    # Searching AIs get a slice of their current move delay, which shrinks under speed boost
+    budget = state.move_delays()[player_idx] * SEARCH_TIME_FRACTION
+    return [ai_move(state.board, pos, state.rows, state.cols, state.difficulty, player_idx, state.player_positions, state.mode, state.powerups, budget, table, pool, state.player_rngs[player_idx])]
+
+def match_policy(pool=None):
+    # ai_policy with a transposition table per player that lives for one match
+    tables = {}
+    def policy(state, player_idx):
+        if player_idx not in tables:
+            tables[player_idx] = TranspositionTable(state.rows, state.cols)
+        return ai_policy(state, player_idx, tables[player_idx], pool)
+    policy.tables = tables
+    return policy
+
+def search_pool(settings, workers=SEARCH_WORKERS):
+    # Process pool for Hard+ games, or None when searching in-process
+    if workers and settings.get('difficulty') == HARD_PLUS:
+        return ParallelSearch(workers)
+    return None
+
+def run_match(settings, clock=None, policies=None, pool=None, replay_path=None):
+    # settings['seed'] fixes the match; replay_path records it with replay.Recorder
+    clock = clock or SimulatedClock()
+    policies = policies or [match_policy(pool), match_policy(pool)]
+    state = GameState.from_settings(dict(settings, mode="AI vs AI"), now_ms=clock())
+    if replay_path is not None:
+        state.recorder = Recorder(replay_path, state)
+    # Steps are a few microseconds each; keep even a null timer out of the plain path
+    timed = profiler.enabled
+    now_ms = None
+    while not state.over:
+        now_ms = clock()
+        if timed:
+            with profiler.timer('step'):
+                step(state, policies, now_ms)
+        else:
+            step(state, policies, now_ms)
+    if state.recorder is not None:
+        state.recorder.close(state, now_ms)
+    return state
+
+def main():
+    parser = argparse.ArgumentParser(description='Run AI vs AI matches without a display')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--size', type=int, default=BOARD_SIZES[-1])
+    parser.add_argument('--timer', type=int, default=TIMER_OPTIONS[0])
+    parser.add_argument('--difficulty', type=int, default=2)
+    parser.add_argument('--tick', type=int, default=TICK_MS)
+    parser.add_argument('--workers', type=int, default=SEARCH_WORKERS, help='processes for Hard+ search (0 = in-process)')
+    parser.add_argument('--profile', default=PROFILE_PATH, help='write timings and search counters to this JSON file')
+    parser.add_argument('--replay-dir', default=None, help='record every match to this directory')
+    parser.add_argument('--seed', type=int, default=None, help='seed match i with seed + i')
+    args = parser.parse_args()
+    profiler.enabled = bool(args.profile)
+    settings = {'size': args.size, 'timer': args.timer, 'difficulty': args.difficulty}
+    pool = search_pool(settings, args.workers)
+    wins = [0, 0, 0]
+    start = time.perf_counter()
+    try:
+        if args.replay_dir:
+            os.makedirs(args.replay_dir, exist_ok=True)
+        for i in range(args.games):
+            match_settings = dict(settings, seed=None if args.seed is None else args.seed + i)
+            replay_path = os.path.join(args.replay_dir, f'match_{i:06d}.trpl') if args.replay_dir else None
+            state = run_match(match_settings, SimulatedClock(args.tick), pool=pool, replay_path=replay_path)
+            wins[state.winner()] += 1
+    finally:
+        if pool is not None:
+            pool.close()
+    elapsed = time.perf_counter() - start
+    print(f"{args.games} games in {elapsed:.2f}s ({args.games / elapsed:.1f} games/s)")
+    print(f"Player 1 wins: {wins[0]}  Player 2 wins: {wins[1]}  Ties: {wins[-1]}")
+    if profiler.enabled:
+        profiler.dump(args.profile, settings=settings, games=args.games)
+        print(f"Profile written to {args.profile}")
+
+if __name__ == '__main__':
+    main()
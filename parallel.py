@@ -0,0 +1,62 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ai import Evaluator, SearchTimeout, minimax, ordered_moves, search_move, last_search
+from bitboard import BitBoard
+
+# Worker processes for Hard+ search; 0 keeps the search in the game process
+SEARCH_WORKERS = int(os.environ.get('TERRITORY_SEARCH_WORKERS', '0'))
+# Shallower iterations finish faster than a round trip to the pool
+PARALLEL_MIN_DEPTH = 3
+
+def _root_move_value(rows, cols, owners, powerup_bits, player_positions, player_idx, move, depth, deadline_wall, weights=None):
+    # Runs in a worker: rebuild the position from its bitboards and search one root move with a full window
+    board, powerups = BitBoard(rows, cols, owners, powerup_bits).to_arrays()
+    if powerup_bits is None:
+        powerups = None
+    deadline = None if deadline_wall is None else time.perf_counter() + (deadline_wall - time.time())
+    evaluator = Evaluator(board, rows, cols, weights, powerups)
+    nr, nc = move
+    prev_owner = board[nr, nc]
+    player_positions[player_idx] = [nr, nc]
+    board[nr, nc] = player_idx
+    evaluator.make(player_idx, prev_owner, nr*cols + nc)
+    last_search['nodes'] = 0
+    try:
+        val = minimax(board, player_positions, rows, cols, 1-player_idx, depth-1, False, player_idx, 1-player_idx, powerups=powerups, deadline=deadline, evaluator=evaluator)
+    except SearchTimeout:
+        return None
+    return val, last_search['nodes']
+
+class ParallelSearch:
+    # Root-split minimax over a process pool that lives for a whole game. Every root move is
+    # searched with a full window and the first best one in move order wins, which is the move
+    # the serial search_move picks at the same depth. Workers keep no transposition table so
+    # the two stay identical.
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(self.workers)
+
+    def search(self, board, player_positions, rows, cols, player_idx, depth, powerups=None, deadline=None, first_move=None, table=None, weights=None):
+        if depth < PARALLEL_MIN_DEPTH:
+            return search_move(board, player_positions, rows, cols, player_idx, depth, powerups, deadline, first_move, weights=weights)
+        bits = BitBoard.from_arrays(board, powerups)
+        powerup_bits = bits.powerups if powerups is not None else None
+        deadline_wall = None if deadline is None else time.time() + (deadline - time.perf_counter())
+        moves = ordered_moves(board, powerups, player_positions[player_idx], rows, cols, player_idx, first_move)
+        futures = [self.executor.submit(_root_move_value, rows, cols, bits.owners, powerup_bits,
+                                        [list(pos) for pos in player_positions], player_idx, move, depth, deadline_wall, weights)
+                   for move in moves]
+        results = [future.result() for future in futures]
+        if any(result is None for result in results):
+            raise SearchTimeout()
+        best_move, best_val = None, -float('inf')
+        for (nr, nc), (val, nodes) in zip(moves, results):
+            last_search['nodes'] += nodes
+            if best_move is None or val > best_val:
+                best_move, best_val = [nr, nc], val
+        return best_move, best_val
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,96 @@
+import bisect
+import json
+import os
+import platform
+import time
+from contextlib import nullcontext
+
+# Set TERRITORY_PROFILE=<file.json> (or pass --profile to headless.py) to collect timings and
+# counters and write them out when the game ends. Unset, every hook is a no-op
+PROFILE_PATH = os.environ.get('TERRITORY_PROFILE', '')
+# Histogram bucket upper bounds in ms, four per decade from 1 us to 10 s
+BUCKETS_MS = [round(10 ** (e / 4), 6) for e in range(-12, 17)]
+
+_disabled = nullcontext()
+
+class _Timer:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler, self.name = profiler, name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, (time.perf_counter() - self.start) * 1000)
+        return False
+
+class Profiler:
+    # Named timers (log-bucket histograms) and counters. Hot paths check .enabled before
+    # doing any work of their own
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.timers = {}
+        self.counters = {}
+
+    def timer(self, name):
+        if not self.enabled:
+            return _disabled
+        return _Timer(self, name)
+
+    def record(self, name, ms):
+        if not self.enabled:
+            return
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'buckets': [0] * (len(BUCKETS_MS) + 1)}
+        timer['count'] += 1
+        timer['total_ms'] += ms
+        timer['max_ms'] = max(timer['max_ms'], ms)
+        timer['buckets'][bisect.bisect_left(BUCKETS_MS, ms)] += 1
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def reset(self):
+        self.timers.clear()
+        self.counters.clear()
+
+    def report(self):
+        timers = {}
+        for name, timer in sorted(self.timers.items()):
+            bounds = BUCKETS_MS + [float('inf')]
+            summary = {
+                'count': timer['count'],
+                'total_ms': round(timer['total_ms'], 3),
+                'mean_ms': round(timer['total_ms'] / timer['count'], 4),
+                'max_ms': round(timer['max_ms'], 3),
+            }
+            # Percentiles are bucket upper bounds, so they read high by up to one bucket
+            for pct in (50, 95, 99):
+                target, seen = timer['count'] * pct / 100, 0
+                for bound, n in zip(bounds, timer['buckets']):
+                    seen += n
+                    if seen >= target:
+                        summary[f'p{pct}_ms'] = min(bound, summary['max_ms'])
+                        break
+            summary['histogram'] = {f'<={bound}': n for bound, n in zip(bounds, timer['buckets']) if n}
+            timers[name] = summary
+        # <name>_hits over <name>_probes, or over hits + <name>_misses
+        rates = {}
+        for name, hits in self.counters.items():
+            if name.endswith('_hits'):
+                base = name[:-len('_hits')]
+                total = self.counters.get(f'{base}_probes', hits + self.counters.get(f'{base}_misses', 0))
+                rates[f'{base}_hit_rate'] = round(hits / total, 4) if total else 0.0
+        return {'timers': timers, 'counters': dict(sorted(self.counters.items())), 'rates': rates}
+
+    def dump(self, path, **info):
+        report = dict(info, created=time.strftime('%Y-%m-%dT%H:%M:%S'), python=platform.python_version(), **self.report())
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+profiler = Profiler(enabled=bool(PROFILE_PATH))
@@ -0,0 +1,299 @@
+import argparse
+import json
+import mmap
+import struct
+import time
+
+import numpy as np
+
+from engine import GameState, FreeCells, TIMED_EFFECTS, DIRECTIONS4, update_clock, move_player
+
+# File layout:
+#   header   MAGIC, version byte, u32 length + JSON settings (size, timer, modes, start time, seed)
+#   records  one type byte each, appended as the game runs:
+#            TICK    varint ms since the previous tick (or since the start)
+#            SPAWN   varint cell, type byte                 (belongs to the TICK before it)
+#            MOVE    player byte, length byte, one step code per cell
+#            KEYFRAME varint absolute ms, then the full state after that tick
+#            END     varint absolute ms when the game stopped
+#   index    (ms, offset) of every keyframe, written on close
+#   trailer  fixed size: index offset, keyframe count, final scores, end ms
+# A file cut off before the trailer still plays; it just has no index to seek with.
+MAGIC = b'TRPL'
+TRAILER_MAGIC = b'TRPX'
+VERSION = 1
+TICK, SPAWN, MOVE, KEYFRAME, END = range(1, 6)
+# Keyframe after this many recorded ticks
+KEYFRAME_INTERVAL = 64
+# Step codes: index into DIRECTIONS4, stay in place, or an absolute varint cell
+STAY, JUMP = len(DIRECTIONS4), len(DIRECTIONS4) + 1
+STEP_CODES = {delta: code for code, delta in enumerate(DIRECTIONS4)}
+EFFECTS = list(TIMED_EFFECTS.values())
+
+_header = struct.Struct('<4sBI')
+_trailer = struct.Struct('<4sQIHHq')
+_index_entry = struct.Struct('<qQ')
+
+def _varint(value, out):
+    # Unsigned LEB128
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _read_varint(buf, pos):
+    value = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+def _encode_keyframe(state, now_ms, out):
+    _varint(now_ms, out)
+    out += (state.board + 1).astype(np.uint8).tobytes()
+    out += (state.powerups + 1).astype(np.uint8).tobytes()
+    for player in [0, 1]:
+        for value in (*state.player_positions[player], state.scores[player], state.freeze_end_time[player], state.last_move_time[player]):
+            _varint(value, out)
+        for effect in EFFECTS:
+            _varint(state.powerup_end_times[player].get(effect, 0), out)
+    _varint(state.powerup_spawn_timer, out)
+
+def _decode_keyframe(buf, pos, state):
+    now_ms, pos = _read_varint(buf, pos)
+    cells = state.rows * state.cols
+    state.board[:] = np.frombuffer(buf, np.uint8, cells, pos).reshape(state.rows, state.cols).astype(int) - 1
+    pos += cells
+    state.powerups[:] = np.frombuffer(buf, np.uint8, cells, pos).reshape(state.rows, state.cols).astype(int) - 1
+    pos += cells
+    for player in [0, 1]:
+        values = []
+        for _ in range(5):
+            value, pos = _read_varint(buf, pos)
+            values.append(value)
+        state.player_positions[player] = values[:2]
+        state.scores[player], state.freeze_end_time[player], state.last_move_time[player] = values[2:]
+        state.powerup_end_times[player] = {}
+        for effect in EFFECTS:
+            end, pos = _read_varint(buf, pos)
+            if end:
+                state.powerup_end_times[player][effect] = end
+            # An effect is on exactly while its end time is ahead of the last tick
+            state.powerup_effects[player][effect] = end > now_ms
+    state.powerup_spawn_timer, pos = _read_varint(buf, pos)
+    return now_ms, pos
+
+class Recorder:
+    # Streams one game to path as it is played. Set it as state.recorder and engine.step
+    # reports every tick with a spawn or a move; call close() when the game ends
+    def __init__(self, path, state, **info):
+        self.file = open(path, 'wb')
+        self.cols = state.cols
+        # Where each player stood after the last recorded tick; moves are coded relative to it
+        self.positions = [tuple(pos) for pos in state.player_positions]
+        self.last_ms = state.start_ticks
+        self.ticks = 0
+        self.keyframes = []
+        self.offset = 0
+        settings = dict(info, size=state.rows, timer=state.timer, player_types=state.player_types,
+                        difficulty=state.difficulty, mode=state.mode, start_ms=state.start_ticks, seed=state.seed)
+        payload = json.dumps(settings).encode()
+        self._write(_header.pack(MAGIC, VERSION, len(payload)) + payload)
+
+    def _write(self, data):
+        self.file.write(data)
+        self.offset += len(data)
+
+    def record(self, state, now_ms, spawned, moves):
+        if spawned is None and not moves:
+            return
+        out = bytearray([TICK])
+        _varint(now_ms - self.last_ms, out)
+        self.last_ms = now_ms
+        if spawned is not None:
+            row, col, powerup_type = spawned
+            out.append(SPAWN)
+            _varint(row * self.cols + col, out)
+            out.append(powerup_type)
+        for player_idx, path in moves:
+            out += bytes([MOVE, player_idx, len(path)])
+            prev = self.positions[player_idx]
+            for row, col in path:
+                code = STAY if (row, col) == prev else STEP_CODES.get((row - prev[0], col - prev[1]))
+                if code is None:
+                    out.append(JUMP)
+                    _varint(row * self.cols + col, out)
+                else:
+                    out.append(code)
+                prev = (row, col)
+            self.positions[player_idx] = prev
+        self.ticks += 1
+        if self.ticks % KEYFRAME_INTERVAL == 0:
+            self.keyframes.append((now_ms, self.offset + len(out)))
+            out.append(KEYFRAME)
+            _encode_keyframe(state, now_ms, out)
+        self._write(bytes(out))
+
+    def close(self, state, now_ms=None):
+        # now_ms is when the game stopped; defaults to the last recorded tick
+        end_ms = self.last_ms if now_ms is None else now_ms
+        out = bytearray([END])
+        _varint(end_ms, out)
+        self._write(bytes(out))
+        index_offset = self.offset
+        for entry in self.keyframes:
+            self._write(_index_entry.pack(*entry))
+        scores = state.final_scores()
+        self._write(_trailer.pack(TRAILER_MAGIC, index_offset, len(self.keyframes), scores[0], scores[1], end_ms))
+        self.file.close()
+
+class Replay:
+    # Read side, over a memory map: the header and trailer are read up front, records lazily
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, length = _header.unpack_from(self.mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} replay")
+        self.settings = json.loads(self.mmap[_header.size:_header.size + length])
+        self.records_start = _header.size + length
+        self.keyframes, self.final_scores, self.end_ms = [], None, None
+        self.records_end = len(self.mmap)
+        if len(self.mmap) >= self.records_start + _trailer.size:
+            magic, index_offset, count, score0, score1, end_ms = _trailer.unpack_from(self.mmap, len(self.mmap) - _trailer.size)
+            if magic == TRAILER_MAGIC:
+                self.keyframes = [_index_entry.unpack_from(self.mmap, index_offset + i * _index_entry.size) for i in range(count)]
+                self.final_scores, self.end_ms = [score0, score1], end_ms
+                self.records_end = index_offset
+
+    def close(self):
+        self.mmap.close()
+
+    def new_state(self):
+        settings = self.settings
+        return GameState(settings['size'], settings['size'], settings['timer'], settings['player_types'],
+                         settings['difficulty'], settings['mode'], settings['start_ms'], settings['seed'])
+
+    def ticks(self, positions, cols, pos=None, last_ms=None):
+        # Decode records from pos, yielding (ms, spawned, moves) per tick and finally
+        # (end ms, None, None) if the game was closed properly. positions are where the players
+        # stand at pos, needed to decode the relative move codes
+        buf = self.mmap
+        pos = self.records_start if pos is None else pos
+        last_ms = self.settings['start_ms'] if last_ms is None else last_ms
+        positions = [list(p) for p in positions]
+        now_ms, spawned, moves = None, None, []
+        while pos < self.records_end:
+            kind = buf[pos]
+            pos += 1
+            if kind in (TICK, END) and now_ms is not None:
+                yield now_ms, spawned, moves
+                now_ms, spawned, moves = None, None, []
+            if kind == TICK:
+                delta, pos = _read_varint(buf, pos)
+                now_ms = last_ms = last_ms + delta
+            elif kind == SPAWN:
+                cell, pos = _read_varint(buf, pos)
+                spawned = (*divmod(cell, cols), buf[pos])
+                pos += 1
+            elif kind == MOVE:
+                player_idx, length = buf[pos], buf[pos + 1]
+                pos += 2
+                prev = positions[player_idx]
+                path = []
+                for _ in range(length):
+                    code = buf[pos]
+                    pos += 1
+                    if code == JUMP:
+                        cell, pos = _read_varint(buf, pos)
+                        cell = list(divmod(cell, cols))
+                    elif code == STAY:
+                        cell = list(prev)
+                    else:
+                        cell = [prev[0] + DIRECTIONS4[code][0], prev[1] + DIRECTIONS4[code][1]]
+                    path.append(cell)
+                    prev = cell
+                positions[player_idx] = prev
+                moves.append((player_idx, path))
+            elif kind == KEYFRAME:
+                # Only needed for seeking; skip over it
+                pos = _skip_keyframe(buf, pos, self.settings['size'] ** 2)
+            elif kind == END:
+                end_ms, pos = _read_varint(buf, pos)
+                yield end_ms, None, None
+                return
+            else:
+                raise ValueError(f"bad record type {kind} at offset {pos - 1}")
+        if now_ms is not None:
+            yield now_ms, spawned, moves
+
+    def state_at(self, ms=None):
+        # State at ms (the end of the game when ms is None), replayed from the nearest keyframe
+        state = self.new_state()
+        pos, last_ms = None, None
+        for keyframe_ms, offset in self.keyframes:
+            if ms is not None and keyframe_ms > ms:
+                break
+            pos, last_ms = offset, keyframe_ms
+        if pos is not None:
+            last_ms, pos = _decode_keyframe(self.mmap, pos + 1, state)
+            state.free_cells = FreeCells(state.powerups)
+        for now_ms, spawned, moves in self.ticks(state.player_positions, state.cols, pos, last_ms):
+            if ms is not None and now_ms > ms:
+                break
+            if moves is None:
+                # END: the game stopped here
+                update_clock(state, now_ms)
+                state.over = True
+                return state
+            apply_tick(state, now_ms, spawned, moves)
+        if ms is not None:
+            update_clock(state, ms)
+            state.over = state.time_left <= 0
+        return state
+
+def _skip_keyframe(buf, pos, cells):
+    _, pos = _read_varint(buf, pos)
+    pos += 2 * cells
+    for _ in range(2 * (5 + len(EFFECTS)) + 1):
+        _, pos = _read_varint(buf, pos)
+    return pos
+
+def apply_tick(state, now_ms, spawned, moves):
+    # engine.step with the recorded spawn and moves in place of the RNG and the policies
+    if spawned is not None:
+        row, col, powerup_type = spawned
+        state.powerups[row, col] = powerup_type
+        state.free_cells.remove(row, col)
+        state.powerup_spawn_timer = now_ms
+    update_clock(state, now_ms)
+    for player_idx, path in moves:
+        move_player(state, player_idx, path, now_ms)
+    if state.time_left <= 0:
+        state.over = True
+
+def main():
+    parser = argparse.ArgumentParser(description='Play back recorded games without a display')
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--at', type=int, default=None, help='show the board this many ms into the game')
+    parser.add_argument('--summary', action='store_true', help='only read headers and trailers')
+    args = parser.parse_args()
+    start = time.perf_counter()
+    for path in args.files:
+        replay = Replay(path)
+        if args.summary:
+            print(f"{path}: size {replay.settings['size']} {replay.settings['mode']} scores {replay.final_scores}")
+        else:
+            ms = None if args.at is None else replay.settings['start_ms'] + args.at
+            state = replay.state_at(ms)
+            print(f"{path}: scores {state.final_scores()} positions {state.player_positions} time left {state.time_left}s")
+            if args.at is not None:
+                print(state.board)
+        replay.close()
+    print(f"{len(args.files)} replays in {time.perf_counter() - start:.3f}s")
+
+if __name__ == '__main__':
+    main()
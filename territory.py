@@ -1,63 +1,28 @@
 import pygame
-import sys
 import numpy as np
-import random
 import time
 import math
+import os
+from collections import OrderedDict, deque
+
+from engine import (
+    ROWS, COLS, FREEZE, BONUS, SHIELD, SPEED_BOOST, TERRITORY_BOMB, DOUBLE_POINTS, POWERUP_TYPES,
+    BOARD_SIZES, TIMER_OPTIONS, DIFFICULTY_OPTIONS, GameState, step, human_path
+)
+from async_ai import async_policy
+from profiling import profiler, PROFILE_PATH
+from replay import Recorder
 
 # Constants
 WIDTH, HEIGHT = 800, 800
-ROWS, COLS = 14, 14
 TILE_SIZE = WIDTH // COLS
 LIGHT_BG = (240, 240, 255)
 GRID_COLOR = (180, 180, 200)
 PLAYER_COLORS = [(80, 180, 255), (255, 100, 100)]
 FONT_COLOR = (50, 50, 80)
 
-# Power-up types and their properties
-FREEZE = 0
-BONUS = 1
-SHIELD = 2
-SPEED_BOOST = 3
-TERRITORY_BOMB = 4
-DOUBLE_POINTS = 5
-
-POWERUP_TYPES = {
-    FREEZE: {
-        'color': (0, 255, 0),
-        'duration': 5,  # seconds
-        'spawn_weight': 1
-    },
-    BONUS: {
-        'color': (255, 255, 0),
-        'duration': 1,
-        'spawn_weight': 1
-    },
-    SHIELD: {
-        'color': (0, 0, 255),
-        'duration': 5,  # seconds
-        'spawn_weight': 1
-    },
-    SPEED_BOOST: {
-        'color': (255, 0, 0),
-        'duration': 5,  # seconds
-        'spawn_weight': 1
-    },
-    TERRITORY_BOMB: {
-        'color': (255, 165, 0),
-        'duration': 1,
-        'spawn_weight': 1
-    },
-    DOUBLE_POINTS: {
-        'color': (0, 255, 128),
-        'duration': 5,  # seconds
-        'spawn_weight': 1
-    }
-}
-
 # Powerup colors for visualization
 POWERUP_COLORS = [p['color'] for p in POWERUP_TYPES.values()]
-ANIMATION_FRAMES = 10
 
 # New UI constants
 BUTTON_COLOR = (255, 100, 100)
@@ -68,7 +33,6 @@ TITLE_COLOR = (50, 50, 80)
 DECORATIVE_COLOR = (180, 210, 255)
 
 # Add player state and movement logic for real-time play
-PLAYER_ICONS = [pygame.Surface((1, 1)), pygame.Surface((1, 1))]
 PLAYER_STARTS = [(0, 0), (ROWS-1, COLS-1)]
 PLAYER_KEYS = [
     {pygame.K_UP: (-1, 0), pygame.K_DOWN: (1, 0), pygame.K_LEFT: (0, -1), pygame.K_RIGHT: (0, 1)},
@@ -79,16 +43,116 @@ PLAYER_KEYS = [
 COLOR_PALETTE = [
     (80, 180, 255), (255, 100, 100), (120, 200, 120), (255, 180, 60), (180, 120, 255), (255, 120, 200), (80, 80, 180)
 ]
-BOARD_SIZES = [8, 10, 12, 14]
-TIMER_OPTIONS = [10, 60, 90, 120]
-DIFFICULTY_OPTIONS = ["Easy", "Medium", "Hard"]
 
-pygame.init()
-screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE | pygame.DOUBLEBUF)
-pygame.display.set_caption('AI-Based Board Game: Territory Conquest')
-font = pygame.font.SysFont('Roboto', 36, bold=True)
-title_font = pygame.font.SysFont('Roboto', 64, bold=True)
-clock = pygame.time.Clock()
+# Fonts are created once per (name, size, bold); rendered text is kept in an LRU cache
+TEXT_CACHE_SIZE = 512
+_fonts = {}
+_text_cache = OrderedDict()
+
+def get_font(size, bold=True, name='Roboto'):
+    key = (name, size, bold)
+    if key not in _fonts:
+        _fonts[key] = pygame.font.SysFont(name, size, bold=bold)
+    return _fonts[key]
+
+def render_text(font, text, color):
+    key = (text, font, tuple(color))
+    surf = _text_cache.get(key)
+    if profiler.enabled:
+        profiler.count('text_cache_hits' if surf is not None else 'text_cache_misses')
+    if surf is None:
+        surf = font.render(text, True, color)
+        _text_cache[key] = surf
+        if len(_text_cache) > TEXT_CACHE_SIZE:
+            _text_cache.popitem(last=False)
+    else:
+        _text_cache.move_to_end(key)
+    return surf
+
+# Set TERRITORY_REPLAY_DIR to record every game there (see replay.py)
+REPLAY_DIR = os.environ.get('TERRITORY_REPLAY_DIR', '')
+# Set TERRITORY_SEED=<int> to fix the powerup spawns and AI choices of every game; unset, each
+# game draws its own seed and prints it so the game can be played again
+SEED = os.environ.get('TERRITORY_SEED', '')
+
+# Frame pacing: every screen runs off one FrameClock. Set TERRITORY_FRAME_STATS=1 to start
+# with the timing overlay on (F3 toggles it in game)
+FPS = 60
+FRAME_STATS = os.environ.get('TERRITORY_FRAME_STATS', '') not in ('', '0')
+FRAME_PHASES = ('ai', 'rules', 'render')
+
+class FrameClock:
+    # Single frame limiter for the whole game, plus a rolling window of frame times and of the
+    # time each frame spent in the AI, the rules and drawing
+    def __init__(self, fps=FPS, window=300):
+        self.fps = fps
+        self.clock = pygame.time.Clock()
+        self.frame_ms = deque(maxlen=window)
+        self.phase_ms = {phase: deque(maxlen=window) for phase in FRAME_PHASES}
+        self.current = dict.fromkeys(FRAME_PHASES, 0.0)
+        self.last_frame = None
+        self.show_overlay = FRAME_STATS
+
+    def add(self, phase, start):
+        # Charge the time since a perf_counter() start to a phase of this frame
+        self.current[phase] += (time.perf_counter() - start) * 1000
+
+    def tick(self):
+        self.clock.tick(self.fps)
+        # Clock.tick only has whole milliseconds; percentiles want finer
+        now = time.perf_counter()
+        if self.last_frame is not None:
+            self.frame_ms.append((now - self.last_frame) * 1000)
+        self.last_frame = now
+        for phase in FRAME_PHASES:
+            self.phase_ms[phase].append(self.current[phase])
+            profiler.record(f'frame_{phase}', self.current[phase])
+            self.current[phase] = 0.0
+        if self.frame_ms:
+            profiler.record('frame', self.frame_ms[-1])
+
+    def reset(self):
+        self.last_frame = None
+        self.frame_ms.clear()
+        for phase in FRAME_PHASES:
+            self.phase_ms[phase].clear()
+
+    def summary(self):
+        if not self.frame_ms:
+            return {}
+        frame_ms = np.array(self.frame_ms)
+        p50, p95, p99 = np.percentile(frame_ms, [50, 95, 99])
+        stats = {'fps': self.clock.get_fps(), 'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99, 'max_ms': frame_ms.max()}
+        for phase in FRAME_PHASES:
+            stats[f'{phase}_ms'] = np.mean(self.phase_ms[phase])
+        return {'frames': len(frame_ms), **{key: round(float(value), 2) for key, value in stats.items()}}
+
+def timed_policy(policy, frame_clock):
+    # Wraps an engine.step action so time spent choosing moves shows up as AI, not rules
+    def timed(state, player_idx):
+        start = time.perf_counter()
+        try:
+            return policy(state, player_idx)
+        finally:
+            frame_clock.add('ai', start)
+    timed.close = policy.close
+    return timed
+
+# Window and fonts are opened by init_display when the UI starts, so importing this module
+# (tools, benchmarks, spawned worker processes) never touches SDL
+screen = None
+font = None
+title_font = None
+
+def init_display():
+    global screen, font, title_font
+    if screen is None:
+        pygame.init()
+        screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE | pygame.DOUBLEBUF)
+        pygame.display.set_caption('AI-Based Board Game: Territory Conquest')
+        font = get_font(36)
+        title_font = get_font(64)
+    return screen
 
 def draw_powerup_icon(surface, icon_type, rect):
     color = POWERUP_TYPES[icon_type]['color']
@@ -138,7 +202,7 @@ def draw_powerup_icon(surface, icon_type, rect):
             end_y = rect.centery + math.sin(angle) * rect.height//3
             pygame.draw.line(surface, (255, 255, 255), rect.center, (end_x, end_y), 2)
 
-def draw_board(board, powerups, animations, player_positions, rows, cols, player_colors):
+def board_layout(rows, cols):
     sidebar_w = 220
     board_size = min(screen.get_width() - sidebar_w - 40, screen.get_height() - 120) * 0.95
     tile_size = int(board_size // cols)
@@ -146,205 +210,220 @@ def draw_board(board, powerups, animations, player_positions, rows, cols, player
     board_h = tile_size * rows
     board_x = (screen.get_width() - sidebar_w - board_w) // 2
     board_y = (screen.get_height() - board_h) // 2 + 40
+    return board_x, board_y, board_w, board_h, tile_size, sidebar_w
+
+def draw_board_base(surface, board_x, board_y, board_w, board_h):
     shadow_surf = pygame.Surface((board_w + 16, board_h + 16), pygame.SRCALPHA)
     pygame.draw.rect(shadow_surf, (0, 0, 0, 60), (8, 8, board_w, board_h), border_radius=24)
-    screen.blit(shadow_surf, (board_x - 8, board_y - 8))
-    pygame.draw.rect(screen, (255, 255, 255), (board_x, board_y, board_w, board_h), border_radius=18)
-    pygame.draw.rect(screen, GRID_COLOR, (board_x, board_y, board_w, board_h), 4, border_radius=18)
+    surface.blit(shadow_surf, (board_x - 8, board_y - 8))
+    pygame.draw.rect(surface, (255, 255, 255), (board_x, board_y, board_w, board_h), border_radius=18)
+    pygame.draw.rect(surface, GRID_COLOR, (board_x, board_y, board_w, board_h), 4, border_radius=18)
+
+def tile_rect(row, col, board_x, board_y, tile_size):
+    return pygame.Rect(board_x + col * tile_size, board_y + row * tile_size, tile_size, tile_size)
+
+class TileAtlas:
+    # Pre-rendered board background and tile layers for one board and tile size and color set.
+    # Each layer is drawn at the tile's origin exactly as it used to be drawn on screen, so
+    # stacking them reproduces the old per-tile drawing with plain blits
+    def __init__(self, rows, cols, tile_size, player_colors):
+        self.key = (rows, cols, tile_size, tuple(player_colors))
+        # Shadow, board and border over the window background, which sits under it on every frame
+        board_w, board_h = cols * tile_size, rows * tile_size
+        self.base = pygame.Surface((board_w + 16, board_h + 16))
+        self.base.fill((245, 245, 255))
+        draw_board_base(self.base, 8, 8, board_w, board_h)
+        self.base = self.base.convert()
+        size = (tile_size, tile_size)
+        rect = pygame.Rect(0, 0, tile_size, tile_size)
+        self.grid = pygame.Surface(size, pygame.SRCALPHA)
+        pygame.draw.rect(self.grid, GRID_COLOR, rect, 1, border_radius=6)
+        self.glows, self.discs, self.players = [], [], []
+        for color in player_colors:
+            glow = pygame.Surface(size, pygame.SRCALPHA)
+            pygame.draw.ellipse(glow, (*color, 80), rect)
+            disc = pygame.Surface(size, pygame.SRCALPHA)
+            pygame.draw.ellipse(disc, color, rect.inflate(-tile_size//8, -tile_size//8))
+            player = pygame.Surface(size, pygame.SRCALPHA)
+            pygame.draw.ellipse(player, color, rect.inflate(-tile_size//3, -tile_size//3), 0)
+            pygame.draw.ellipse(player, (255,255,255), rect.inflate(-tile_size//2, -tile_size//2), 2)
+            self.glows.append(glow)
+            self.discs.append(disc)
+            self.players.append(player)
+        self.powerups = []
+        for powerup_type in range(len(POWERUP_TYPES)):
+            icon = pygame.Surface(size, pygame.SRCALPHA)
+            draw_powerup_icon(icon, powerup_type, rect.inflate(-tile_size//2, -tile_size//2))
+            self.powerups.append(icon)
+        # Match the display's pixel format so blits skip the conversion
+        self.grid = self.grid.convert_alpha()
+        self.glows = [glow.convert_alpha() for glow in self.glows]
+        self.discs = [disc.convert_alpha() for disc in self.discs]
+        self.players = [player.convert_alpha() for player in self.players]
+        self.powerups = [icon.convert_alpha() for icon in self.powerups]
+
+    def tile_blits(self, board, powerups, row, col, topleft):
+        blits = [(self.grid, topleft)]
+        owner = board[row, col]
+        if owner != -1:
+            blits.append((self.glows[owner], topleft))
+            blits.append((self.discs[owner], topleft))
+        #Visualize powerups on layout
+        if powerups[row, col] != -1:
+            blits.append((self.powerups[powerups[row, col]], topleft))
+        return blits
+
+_atlas = None
+
+def tile_atlas(rows, cols, tile_size, player_colors):
+    # Rebuilt only when a resize changes the tile size, or the board size or colors change
+    global _atlas
+    if _atlas is None or _atlas.key != (rows, cols, tile_size, tuple(player_colors)):
+        _atlas = TileAtlas(rows, cols, tile_size, player_colors)
+    return _atlas
+
+def draw_board(board, powerups, animations, player_positions, rows, cols, player_colors):
+    board_x, board_y, board_w, board_h, tile_size, sidebar_w = board_layout(rows, cols)
+    atlas = tile_atlas(rows, cols, tile_size, player_colors)
+    blits = [(atlas.base, (board_x - 8, board_y - 8))]
     for row in range(rows):
         for col in range(cols):
-            rect = pygame.Rect(board_x + col * tile_size, board_y + row * tile_size, tile_size, tile_size)
-            pygame.draw.rect(screen, GRID_COLOR, rect, 1, border_radius=6)
-            if board[row, col] != -1:
-                color = player_colors[board[row, col]]
-                glow_surf = pygame.Surface((tile_size, tile_size), pygame.SRCALPHA)
-                pygame.draw.ellipse(glow_surf, (*color, 80), (0, 0, tile_size, tile_size))
-                screen.blit(glow_surf, rect.topleft)
-                pygame.draw.ellipse(screen, color, rect.inflate(-tile_size//8, -tile_size//8))
-            #Visualize powerups on layout
-            if powerups[row, col] != -1:
-                powerup_rect = rect.inflate(-tile_size//2, -tile_size//2)
-                draw_powerup_icon(screen, powerups[row, col], powerup_rect)
+            blits.extend(atlas.tile_blits(board, powerups, row, col, (board_x + col * tile_size, board_y + row * tile_size)))
     for idx, (prow, pcol) in enumerate(player_positions):
-        rect = pygame.Rect(board_x + pcol * tile_size, board_y + prow * tile_size, tile_size, tile_size)
-        pygame.draw.ellipse(screen, player_colors[idx], rect.inflate(-tile_size//3, -tile_size//3), 0)
-        pygame.draw.ellipse(screen, (255,255,255), rect.inflate(-tile_size//2, -tile_size//2), 2)
+        blits.append((atlas.players[idx], (board_x + pcol * tile_size, board_y + prow * tile_size)))
+    screen.blits(blits, doreturn=False)
     return board_x, board_y, board_w, sidebar_w
 
+class BoardLayer:
+    # Keeps what the board looked like on the last frame so only changed cells (claims, powerup
+    # spawns and pickups, player moves) are redrawn. The screen surface holds the rest between
+    # frames; a new window size or new colors force one full redraw
+    def __init__(self):
+        self.key = None
+        self.board = self.powerups = self.positions = None
+
+    def needs_full_redraw(self, rows, cols, player_colors):
+        return self.key != (screen.get_size(), rows, cols, tuple(player_colors))
+
+    def remember(self, board, powerups, player_positions, rows, cols, player_colors):
+        self.key = (screen.get_size(), rows, cols, tuple(player_colors))
+        self.board, self.powerups = board.copy(), powerups.copy()
+        self.positions = [tuple(pos) for pos in player_positions]
+
+    def redraw_changed(self, board, powerups, player_positions, rows, cols, player_colors):
+        board_x, board_y, board_w, board_h, tile_size, _ = board_layout(rows, cols)
+        atlas = tile_atlas(rows, cols, tile_size, player_colors)
+        changed = np.argwhere((board != self.board) | (powerups != self.powerups))
+        cells = {(int(r), int(c)) for r, c in changed}
+        positions = [tuple(pos) for pos in player_positions]
+        if positions != self.positions:
+            cells.update(self.positions)
+            cells.update(positions)
+        rects = []
+        for row, col in cells:
+            rect = tile_rect(row, col, board_x, board_y, tile_size)
+            # Repeat the full draw order, clipped to this tile
+            screen.set_clip(rect)
+            blits = [(atlas.base, (board_x - 8, board_y - 8))]
+            blits.extend(atlas.tile_blits(board, powerups, row, col, rect.topleft))
+            blits.extend((atlas.players[idx], rect.topleft) for idx, pos in enumerate(positions) if pos == (row, col))
+            screen.blits(blits, doreturn=False)
+            screen.set_clip(None)
+            rects.append(rect)
+        self.remember(board, powerups, player_positions, rows, cols, player_colors)
+        return rects
+
 def draw_ui(mode, current_player, speed, scores, board_x, board_y, board_w):
     indicator_y = board_y - 70
     indicator_x = board_x + board_w // 2
     turn_text = f"Player {current_player + 1}'s Turn"
     turn_color = PLAYER_COLORS[current_player]
-    turn_font = pygame.font.SysFont('Roboto', 32, bold=True)
-    text_surf = turn_font.render(turn_text, True, turn_color)
+    turn_font = get_font(32)
+    text_surf = render_text(turn_font, turn_text, turn_color)
     text_rect = text_surf.get_rect(center=(indicator_x, indicator_y))
     screen.blit(text_surf, text_rect)
     # Draw a small circle icon for the player
     pygame.draw.circle(screen, turn_color, (indicator_x - text_rect.width // 2 - 30, indicator_y + 8), 14)
     # Score display
-    score_font = pygame.font.SysFont('Roboto', 28, bold=True)
+    score_font = get_font(28)
     score_text = f"Score:  Player 1: {scores[0]}    Player 2: {scores[1]}"
-    score_surf = score_font.render(score_text, True, FONT_COLOR)
+    score_surf = render_text(score_font, score_text, FONT_COLOR)
     score_rect = score_surf.get_rect(center=(indicator_x, indicator_y + 40))
     screen.blit(score_surf, score_rect)
 
-def heuristic(board, player, rows, cols, player_positions):
-    # Heuristic: controlled tiles + available moves + (optional) distance to center
-    score = np.sum(board == player)
-    moves = 0
-    for dr, dc in [(-1,0),(1,0),(0,-1),(0,1)]:
-        nr, nc = player_positions[player][0]+dr, player_positions[player][1]+dc
-        if 0 <= nr < rows and 0 <= nc < cols:
-            moves += 1
-    #Center control (to come back in center)
-    center = (rows//2, cols//2)
-    dist_to_center = abs(player_positions[player][0]-center[0]) + abs(player_positions[player][1]-center[1])
-    return score + 0.2*moves - 0.05*dist_to_center
-
-def minimax(board, player_positions, rows, cols, player, depth, maximizing, max_player, min_player):
-    if depth == 0:
-        return heuristic(board, max_player, rows, cols, player_positions)
-    moves = []
-    for dr, dc in [(-1,0),(1,0),(0,-1),(0,1)]:
-        nr, nc = player_positions[player][0]+dr, player_positions[player][1]+dc
-        if 0 <= nr < rows and 0 <= nc < cols:
-            moves.append((nr, nc))
-    if not moves:
-        return heuristic(board, max_player, rows, cols, player_positions)
-    if maximizing:
-        best = -float('inf')
-        for nr, nc in moves:
-            new_board = board.copy()
-            new_positions = [list(pos) for pos in player_positions]
-            new_positions[player] = [nr, nc]
-            new_board[nr, nc] = player  #Steal tile
-            val = minimax(new_board, new_positions, rows, cols, 1-player, depth-1, False, max_player, min_player)
-            best = max(best, val)
-        return best
-    else:
-        best = float('inf')
-        for nr, nc in moves:
-            new_board = board.copy()
-            new_positions = [list(pos) for pos in player_positions]
-            new_positions[player] = [nr, nc]
-            new_board[nr, nc] = player  # Steal tile
-            val = minimax(new_board, new_positions, rows, cols, 1-player, depth-1, True, max_player, min_player)
-            best = min(best, val)
-        return best
-
-def ai_move(board, pos, rows, cols, difficulty, player_idx, player_positions, mode, powerups):
-    #Get possible moves
-    possible_moves = []
-    for dr, dc in [(-1,0),(1,0),(0,-1),(0,1)]:
-        nr, nc = pos[0]+dr, pos[1]+dc
-        if 0 <= nr < rows and 0 <= nc < cols:
-            possible_moves.append((nr, nc))
-
-    # If no possible moves, return current position
-    if not possible_moves:
-        return list(pos)
-
-    # 1. PRIORITIZE POWERUPS
-    for move in possible_moves:
-        if powerups[move[0], move[1]] != -1:
-            return [move[0], move[1]]
-
-    # 2. Otherwise, use difficulty logic
-    if difficulty == 0:
-        return list(random.choice(possible_moves))
-
-    smartness = 0.7 if difficulty == 1 else 0.9
-    good_moves = [move for move in possible_moves if board[move[0], move[1]] != player_idx]
-    
-    if good_moves and random.random() < smartness:
-        return list(random.choice(good_moves))
-    else:
-        return list(random.choice(possible_moves))
-
-def spawn_powerup(powerups):
-    empty_cells = [(row, col) for row in range(powerups.shape[0]) for col in range(powerups.shape[1]) if powerups[row, col] == -1]
-    if empty_cells:
-        row, col = random.choice(empty_cells)
-        # Weighted random choice based on spawn_weight
-        weights = [POWERUP_TYPES[i]['spawn_weight'] for i in range(len(POWERUP_TYPES))]
-        powerup_type = random.choices(range(len(POWERUP_TYPES)), weights=weights)[0]
-        powerups[row, col] = powerup_type
-
-def claim_tile(board, powerups, animations, row, col, player, speed):
-    board[row, col] = player
-    animations[row, col] = ANIMATION_FRAMES
-    if powerups[row, col] != -1:
-        if powerups[row, col] == FREEZE:
-            speed = 0.5  # Slow down AI
-        elif powerups[row, col] == BONUS:
-            # Claim an extra tile if possible
-            for r in range(ROWS):
-                for c in range(COLS):
-                    if board[r, c] == -1 and (r != row or c != col):
-                        board[r, c] = player
-                        animations[r, c] = ANIMATION_FRAMES
-                        break
-                else:
-                    continue
-                break
-        powerups[row, col] = -1
-    return speed
-
-def check_game_over(board):
-    return np.all(board != -1)
 
 def display_winner(scores):
     winner = 0 if scores[0] > scores[1] else 1 if scores[1] > scores[0] else -1
     if winner == -1:
-        text = font.render("It's a tie!", True, FONT_COLOR)
+        text = render_text(font, "It's a tie!", FONT_COLOR)
     else:
-        text = font.render(f'Player {winner + 1} wins!', True, FONT_COLOR)
+        text = render_text(font, f'Player {winner + 1} wins!', FONT_COLOR)
     screen.blit(text, (WIDTH // 2 - 100, HEIGHT // 2))
 
 def draw_animated_background(time_passed):
-    for y in range(HEIGHT):
-        ratio = y / HEIGHT
-        r = int(LIGHT_BG[0] * (1 - ratio) + LIGHT_BG[0] * ratio)
-        g = int(LIGHT_BG[1] * (1 - ratio) + LIGHT_BG[1] * ratio)
-        b = int(LIGHT_BG[2] * (1 - ratio) + LIGHT_BG[2] * ratio)
-        # Add subtle animation
-        offset = math.sin(time_passed * 0.001 + y * 0.01) * 10
-        pygame.draw.line(screen, (r, g, b), (0, y + offset), (WIDTH, y + offset))
+    # One gradient row per screen row, each shifted by a wave; written straight into the pixels
+    y = np.arange(HEIGHT)
+    ratio = (y / HEIGHT)[:, None]
+    colors = (np.array(LIGHT_BG) * (1 - ratio) + np.array(LIGHT_BG) * ratio).astype(int)
+    # Add subtle animation
+    target = (y + np.sin(time_passed * 0.001 + y * 0.01) * 10).astype(int)
+    visible = (target >= 0) & (target < screen.get_height())
+    pixels = pygame.surfarray.pixels2d(screen)
+    pixels[:min(WIDTH, screen.get_width()), target[visible]] = pygame.surfarray.map_array(screen, colors[visible])
+    del pixels
 
 def draw_decorative_border():
     border_width = 4
     pygame.draw.rect(screen, DECORATIVE_COLOR, (0, 0, WIDTH, HEIGHT), border_width)
 
 def draw_title(text, pos):
-    title_surf = title_font.render(text, True, TITLE_COLOR)
+    title_surf = render_text(title_font, text, TITLE_COLOR)
     screen.blit(title_surf, pos)
 
+# Dot sprites for the menu background, keyed by (color shift, glow radius, core radius). There
+# are only a few hundred of them, so every frame is a fill plus one blits batch
+_dot_sprites = {}
+_dot_grids = {}
+
+def dot_sprite(color_shift, glow_radius, core_radius):
+    key = (color_shift, glow_radius, core_radius)
+    if key not in _dot_sprites:
+        dot_color = tuple(min(255, c + color_shift) for c in DECORATIVE_COLOR)
+        # Dots never overlap, so each sprite carries its own patch of background and blits opaque
+        sprite = pygame.Surface((12, 12))
+        sprite.fill(LIGHT_BG)
+        glow_surf = pygame.Surface((12, 12), pygame.SRCALPHA)
+        pygame.draw.circle(glow_surf, (*dot_color, 50), (6, 6), glow_radius)
+        sprite.blit(glow_surf, (0, 0))
+        pygame.draw.circle(sprite, dot_color, (6, 6), core_radius)
+        _dot_sprites[key] = sprite.convert()
+    return _dot_sprites[key]
+
+def dot_grid(width, height):
+    if (width, height) not in _dot_grids:
+        xs, ys = np.meshgrid(np.arange(0, width, 30), np.arange(0, height, 30), indexing='ij')
+        _dot_grids[(width, height)] = (xs.ravel(), ys.ravel())
+    return _dot_grids[(width, height)]
+
 def draw_pattern_background(time_passed):
     screen.fill(LIGHT_BG)
-    for x in range(0, WIDTH, 30):
-        for y in range(0, HEIGHT, 30):
-            
-            x_offset = math.sin(time_passed * 0.001 + x * 0.01) * 5
-            
-            color_shift = int(30 * math.sin(time_passed * 0.001 + x * 0.02 + y * 0.02))
-            dot_color = (
-                min(255, DECORATIVE_COLOR[0] + color_shift),
-                min(255, DECORATIVE_COLOR[1] + color_shift),
-                min(255, DECORATIVE_COLOR[2] + color_shift)
-            )
-            dot_size = 2 + math.sin(time_passed * 0.001 + x * 0.01 + y * 0.01) * 0.7
-        
-            glow_surf = pygame.Surface((12, 12), pygame.SRCALPHA)
-            pygame.draw.circle(glow_surf, (*dot_color, 50), (6, 6), int(dot_size*2.2))
-            screen.blit(glow_surf, (x + x_offset - 6, y - 6))
-            
-            pygame.draw.circle(screen, dot_color, (int(x + x_offset), int(y)), int(dot_size))
+    xs, ys = dot_grid(WIDTH, HEIGHT)
+    phase = time_passed * 0.001
+    x_offset = np.sin(phase + xs * 0.01) * 5
+    color_shift = (30 * np.sin(phase + xs * 0.02 + ys * 0.02)).astype(int)
+    dot_size = 2 + np.sin(phase + xs * 0.01 + ys * 0.01) * 0.7
+    glow_radius = (dot_size * 2.2).astype(int)
+    core_radius = dot_size.astype(int)
+    left = (xs + x_offset).astype(int) - 6
+    top = ys - 6
+    screen.blits([(dot_sprite(shift, glow, core), (x, y))
+                  for shift, glow, core, x, y in zip(color_shift.tolist(), glow_radius.tolist(), core_radius.tolist(), left.tolist(), top.tolist())],
+                 doreturn=False)
 
 def draw_decorative_header():
     header_height = 100 
     pygame.draw.rect(screen, DECORATIVE_COLOR, (0, 0, screen.get_width(), header_height))
-    title = title_font.render('Territory Conquest', True, TITLE_COLOR)
+    title = render_text(title_font, 'Territory Conquest', TITLE_COLOR)
     # Center the title horizontally and vertically in the header
     title_rect = title.get_rect(center=(screen.get_width() // 2, header_height // 2 + 5))  # +5 for slight drop
     screen.blit(title, title_rect)
@@ -357,13 +436,13 @@ def draw_button(text, rect, hovered, font_override=None):
     screen.blit(shadow_surf, shadow_rect.topleft)
     color = BUTTON_HOVER if hovered else BUTTON_COLOR
     pygame.draw.rect(screen, color, rect, border_radius=12)
-    btn_font = font_override if font_override else pygame.font.SysFont('Roboto', 32, bold=True)
+    btn_font = font_override if font_override else get_font(32)
     # Make text fall in shape
     text_to_render = text
     max_width = rect.width - 32
     while btn_font.size(text_to_render)[0] > max_width and len(text_to_render) > 3:
         text_to_render = text_to_render[:-2] + '…'
-    text_surf = btn_font.render(text_to_render, True, BUTTON_TEXT)
+    text_surf = render_text(btn_font, text_to_render, BUTTON_TEXT)
     text_rect = text_surf.get_rect(center=rect.center)
     screen.blit(text_surf, text_rect)
 
@@ -411,7 +490,7 @@ def draw_group_members(time_passed):
     btn_x = screen.get_width() // 2 - btn_w // 2
     start_y = 200
     mouse = pygame.mouse.get_pos()
-    small_font = pygame.font.SysFont('Roboto', 22, bold=True)
+    small_font = get_font(22)
     buttons = [
         ('22K-0500 Anas Saleem', pygame.Rect(btn_x, start_y, btn_w, btn_h)),
         ('22K-4602 Emanay Arshad', pygame.Rect(btn_x, start_y + 70, btn_w, btn_h)),
@@ -429,18 +508,18 @@ def draw_sidebar(scores, time_left, powerups_list, sidebar_x, board_y, board_h):
     sidebar_rect = pygame.Rect(sidebar_x, board_y, 200, board_h)
     pygame.draw.rect(screen, (245, 245, 255), sidebar_rect, border_radius=18)
     pygame.draw.rect(screen, GRID_COLOR, sidebar_rect, 3, border_radius=18)
-    font_big = pygame.font.SysFont('Roboto', 28, bold=True)
-    font_small = pygame.font.SysFont('Roboto', 22, bold=True)
+    font_big = get_font(28)
+    font_small = get_font(22)
     #Scores
-    score1 = font_big.render(f'Player 1: {scores[0]}', True, PLAYER_COLORS[0])
-    score2 = font_big.render(f'Player 2: {scores[1]}', True, PLAYER_COLORS[1])
+    score1 = render_text(font_big, f'Player 1: {scores[0]}', PLAYER_COLORS[0])
+    score2 = render_text(font_big, f'Player 2: {scores[1]}', PLAYER_COLORS[1])
     screen.blit(score1, (sidebar_x + 20, board_y + 30))
     screen.blit(score2, (sidebar_x + 20, board_y + 70))
     #Timer
-    timer = font_big.render(f'Time: {time_left}s', True, (80, 80, 120))
+    timer = render_text(font_big, f'Time: {time_left}s', (80, 80, 120))
     screen.blit(timer, (sidebar_x + 20, board_y + 120))
     #Powerups
-    screen.blit(font_small.render('Powerups:', True, (80, 80, 120)), (sidebar_x + 20, board_y + 180))
+    screen.blit(render_text(font_small, 'Powerups:', (80, 80, 120)), (sidebar_x + 20, board_y + 180))
     for i, p in enumerate(powerups_list):
         if p == 0:
             pygame.draw.circle(screen, (0, 200, 0), (sidebar_x + 40, board_y + 220 + i*40), 14, 3)
@@ -450,11 +529,11 @@ def draw_sidebar(scores, time_left, powerups_list, sidebar_x, board_y, board_h):
 def draw_customization_screen(selected_colors, selected_size, selected_timer, player_names, focus_idx, selected_difficulty):
     draw_pattern_background(pygame.time.get_ticks())
     draw_decorative_header()
-    font_big = pygame.font.SysFont('Roboto', 32, bold=True)
-    font_small = pygame.font.SysFont('Roboto', 24, bold=True)
+    font_big = get_font(32)
+    font_small = get_font(24)
     y = 140
     #Player 1 Color
-    screen.blit(font_big.render('Player 1 Color:', True, FONT_COLOR), (80, y))
+    screen.blit(render_text(font_big, 'Player 1 Color:', FONT_COLOR), (80, y))
     for i, color in enumerate(COLOR_PALETTE):
         rect = pygame.Rect(300 + i*60, y, 40, 40)
         pygame.draw.rect(screen, color, rect, border_radius=8)
@@ -465,7 +544,7 @@ def draw_customization_screen(selected_colors, selected_size, selected_timer, pl
             pygame.draw.line(screen, (180, 180, 180), rect.topright, rect.bottomleft, 4)
     y += 60
     #Player 2 Color
-    screen.blit(font_big.render('Player 2 Color:', True, FONT_COLOR), (80, y))
+    screen.blit(render_text(font_big, 'Player 2 Color:', FONT_COLOR), (80, y))
     for i, color in enumerate(COLOR_PALETTE):
         rect = pygame.Rect(300 + i*60, y, 40, 40)
         pygame.draw.rect(screen, color, rect, border_radius=8)
@@ -476,50 +555,50 @@ def draw_customization_screen(selected_colors, selected_size, selected_timer, pl
             pygame.draw.line(screen, (180, 180, 180), rect.topright, rect.bottomleft, 4)
     y += 70
     #Board Size
-    screen.blit(font_big.render('Board Size:', True, FONT_COLOR), (80, y))
+    screen.blit(render_text(font_big, 'Board Size:', FONT_COLOR), (80, y))
     for i, size in enumerate(BOARD_SIZES):
         rect = pygame.Rect(300 + i*70, y, 60, 40)
         pygame.draw.rect(screen, (220, 240, 255) if selected_size != i else (80, 180, 255), rect, border_radius=8)
-        txt = font_small.render(f'{size}x{size}', True, (50, 50, 80) if selected_size != i else (255,255,255))
+        txt = render_text(font_small, f'{size}x{size}', (50, 50, 80) if selected_size != i else (255,255,255))
         screen.blit(txt, txt.get_rect(center=rect.center))
     y += 60
     #Timer
-    screen.blit(font_big.render('Timer:', True, FONT_COLOR), (80, y))
+    screen.blit(render_text(font_big, 'Timer:', FONT_COLOR), (80, y))
     for i, t in enumerate(TIMER_OPTIONS):
         rect = pygame.Rect(300 + i*70, y, 60, 40)
         pygame.draw.rect(screen, (220, 240, 255) if selected_timer != i else (80, 180, 255), rect, border_radius=8)
-        txt = font_small.render(f'{t}s', True, (50, 50, 80) if selected_timer != i else (255,255,255))
+        txt = render_text(font_small, f'{t}s', (50, 50, 80) if selected_timer != i else (255,255,255))
         screen.blit(txt, txt.get_rect(center=rect.center))
     y += 60
     #Difficulty
-    screen.blit(font_big.render('Difficulty:', True, FONT_COLOR), (80, y))
+    screen.blit(render_text(font_big, 'Difficulty:', FONT_COLOR), (80, y))
     for i, diff in enumerate(DIFFICULTY_OPTIONS):
         rect = pygame.Rect(300 + i*110, y, 100, 40)
         pygame.draw.rect(screen, (220, 240, 255) if selected_difficulty != i else (80, 180, 255), rect, border_radius=8)
-        txt = font_small.render(diff, True, (50, 50, 80) if selected_difficulty != i else (255,255,255))
+        txt = render_text(font_small, diff, (50, 50, 80) if selected_difficulty != i else (255,255,255))
         screen.blit(txt, txt.get_rect(center=rect.center))
     y += 60
     #Player Names
-    screen.blit(font_big.render('Player 1 Name:', True, FONT_COLOR), (80, y))
+    screen.blit(render_text(font_big, 'Player 1 Name:', FONT_COLOR), (80, y))
     name_rect1 = pygame.Rect(300, y, 200, 36)
     pygame.draw.rect(screen, (255,255,255), name_rect1, border_radius=6)
     pygame.draw.rect(screen, (80,180,255) if focus_idx==0 else (180,180,200), name_rect1, 2, border_radius=6)
-    name_surf1 = font_small.render(player_names[0], True, (50,50,80))
+    name_surf1 = render_text(font_small, player_names[0], (50,50,80))
     screen.blit(name_surf1, (name_rect1.x+8, name_rect1.y+6))
     y += 50
-    screen.blit(font_big.render('Player 2 Name:', True, FONT_COLOR), (80, y))
+    screen.blit(render_text(font_big, 'Player 2 Name:', FONT_COLOR), (80, y))
     name_rect2 = pygame.Rect(300, y, 200, 36)
     pygame.draw.rect(screen, (255,255,255), name_rect2, border_radius=6)
     pygame.draw.rect(screen, (80,180,255) if focus_idx==1 else (180,180,200), name_rect2, 2, border_radius=6)
-    name_surf2 = font_small.render(player_names[1], True, (50,50,80))
+    name_surf2 = render_text(font_small, player_names[1], (50,50,80))
     screen.blit(name_surf2, (name_rect2.x+8, name_rect2.y+6))
     #Start/Back buttons
     start_rect = pygame.Rect(300, y+60, 120, 48)
     back_rect = pygame.Rect(440, y+60, 120, 48)
     pygame.draw.rect(screen, (80, 180, 255), start_rect, border_radius=10)
     pygame.draw.rect(screen, (220, 100, 100), back_rect, border_radius=10)
-    screen.blit(font_small.render('Start Game', True, (255,255,255)), start_rect.move(16,10))
-    screen.blit(font_small.render('Back', True, (255,255,255)), back_rect.move(36,10))
+    screen.blit(render_text(font_small, 'Start Game', (255,255,255)), start_rect.move(16,10))
+    screen.blit(render_text(font_small, 'Back', (255,255,255)), back_rect.move(36,10))
     return {
         'color_rects': [(pygame.Rect(300 + i*60, 140, 40, 40), i, 0) for i in range(len(COLOR_PALETTE))] +
                       [(pygame.Rect(300 + i*60, 200, 40, 40), i, 1) for i in range(len(COLOR_PALETTE))],
@@ -532,7 +611,7 @@ def draw_customization_screen(selected_colors, selected_size, selected_timer, pl
     }
 
 def draw_powerup_legend_top():
-    font_small = pygame.font.SysFont('Roboto', 18, bold=True)
+    font_small = get_font(18)
     legend = [
         (FREEZE, 'Freeze', 'Freezes opponent for 5s'),
         (BONUS, 'Bonus', 'Claim +1 tile'),
@@ -550,51 +629,80 @@ def draw_powerup_legend_top():
         row = idx // cols
         icon_rect = pygame.Rect(x0 + col*col_width, y0 + row*row_height, 20, 20)
         draw_powerup_icon(screen, ptype, icon_rect)
-        screen.blit(font_small.render(name, True, (60,60,80)), (icon_rect.right + 4, icon_rect.y))
-        screen.blit(font_small.render(desc, True, (120,120,120)), (icon_rect.right + 4, icon_rect.y + 14))
-
-def draw_game_screen(board, powerups, player_positions, player_names, player_colors, scores, time_left, rows, cols, player_types, powerup_timers, powerup_effects, freeze_end_time, timer_paused_until):
-    screen.fill((245, 245, 255))
-    draw_powerup_legend_top()
-    board_x, board_y, board_w, sidebar_w = draw_board(board, powerups, np.zeros((rows, cols), dtype=int), player_positions, rows, cols, player_colors)
+        screen.blit(render_text(font_small, name, (60,60,80)), (icon_rect.right + 4, icon_rect.y))
+        screen.blit(render_text(font_small, desc, (120,120,120)), (icon_rect.right + 4, icon_rect.y + 14))
+
+def draw_game_screen(board, powerups, player_positions, player_names, player_colors, scores, time_left, rows, cols, player_types, powerup_timers, powerup_effects, freeze_end_time, timer_paused_until, layer=None):
+    # Returns the screen rects that changed, for pygame.display.update
+    if layer is None or layer.needs_full_redraw(rows, cols, player_colors):
+        screen.fill((245, 245, 255))
+        draw_powerup_legend_top()
+        board_x, board_y, board_w, sidebar_w = draw_board(board, powerups, np.zeros((rows, cols), dtype=int), player_positions, rows, cols, player_colors)
+        if layer is not None:
+            layer.remember(board, powerups, player_positions, rows, cols, player_colors)
+        dirty = [screen.get_rect()]
+    else:
+        dirty = layer.redraw_changed(board, powerups, player_positions, rows, cols, player_colors)
+        board_x, board_y, board_w = board_layout(rows, cols)[:3]
     sidebar_rect = pygame.Rect(screen.get_width() - 220, board_y, 200, board_w)
+    # Sidebar text changes every frame; clear and redraw just that panel (out to the window
+    # edge, where long names can spill over)
+    sidebar_area = pygame.Rect(sidebar_rect.x, board_y, screen.get_width() - sidebar_rect.x, board_w)
+    screen.fill((245, 245, 255), sidebar_area)
+    dirty.append(sidebar_area)
     pygame.draw.rect(screen, (235, 235, 250), sidebar_rect, border_radius=18)
     pygame.draw.rect(screen, (180, 180, 200), sidebar_rect, 3, border_radius=18)
-    font_big = pygame.font.SysFont('Roboto', 28, bold=True)
-    font_small = pygame.font.SysFont('Roboto', 22, bold=True)
-    font_timer = pygame.font.SysFont('Roboto', 18, bold=True)
+    font_big = get_font(28)
+    font_small = get_font(22)
+    font_timer = get_font(18)
     current_time = pygame.time.get_ticks()
     for i, (name, color, ptype) in enumerate(zip(player_names, player_colors, player_types)):
         y_offset = board_y + 40 + i*90  # Increased gap
         pygame.draw.circle(screen, color, (sidebar_rect.x + 30, y_offset), 16)
-        screen.blit(font_big.render(name, True, color), (sidebar_rect.x + 60, y_offset - 12))
-        screen.blit(font_small.render(f'Score: {scores[i]}', True, (80, 80, 120)), (sidebar_rect.x + 60, y_offset + 14))
-        type_label = font_small.render(ptype, True, (120, 120, 120))
+        screen.blit(render_text(font_big, name, color), (sidebar_rect.x + 60, y_offset - 12))
+        screen.blit(render_text(font_small, f'Score: {scores[i]}', (80, 80, 120)), (sidebar_rect.x + 60, y_offset + 14))
+        type_label = render_text(font_small, ptype, (120, 120, 120))
         screen.blit(type_label, (sidebar_rect.x + 60, y_offset + 34))
         # Show active powerup timers
         timer_y = y_offset + 54
         if powerup_effects[i]['shield'] and powerup_timers[i].get('shield', 0) > current_time:
             t = int((powerup_timers[i]['shield'] - current_time) / 1000)
-            screen.blit(font_timer.render(f'Shield: {t}s', True, (0,0,255)), (sidebar_rect.x + 60, timer_y))
+            screen.blit(render_text(font_timer, f'Shield: {t}s', (0,0,255)), (sidebar_rect.x + 60, timer_y))
             timer_y += 18
         if powerup_effects[i]['speed_boost'] and powerup_timers[i].get('speed_boost', 0) > current_time:
             t = int((powerup_timers[i]['speed_boost'] - current_time) / 1000)
-            screen.blit(font_timer.render(f'Speed: {t}s', True, (255,0,0)), (sidebar_rect.x + 60, timer_y))
+            screen.blit(render_text(font_timer, f'Speed: {t}s', (255,0,0)), (sidebar_rect.x + 60, timer_y))
             timer_y += 18
         if powerup_effects[i]['double_points'] and powerup_timers[i].get('double_points', 0) > current_time:
             t = int((powerup_timers[i]['double_points'] - current_time) / 1000)
-            screen.blit(font_timer.render(f'Double Points: {t}s', True, (0,180,80)), (sidebar_rect.x + 60, timer_y))
+            screen.blit(render_text(font_timer, f'Double Points: {t}s', (0,180,80)), (sidebar_rect.x + 60, timer_y))
             timer_y += 18
         # Show freeze timer if player is frozen
         if freeze_end_time[i] > current_time:
             t = int((freeze_end_time[i] - current_time) / 1000)
-            screen.blit(font_timer.render(f'Freeze: {t}s', True, (0,200,0)), (sidebar_rect.x + 60, timer_y))
+            screen.blit(render_text(font_timer, f'Freeze: {t}s', (0,200,0)), (sidebar_rect.x + 60, timer_y))
             timer_y += 18
-    timer = font_big.render(f'Time: {time_left}s', True, (80, 80, 120))
+    timer = render_text(font_big, f'Time: {time_left}s', (80, 80, 120))
     screen.blit(timer, (sidebar_rect.x + 20, board_y + board_w - 60))
-    return {}
+    return dirty
+
+def draw_frame_overlay(frame_clock):
+    # Two lines in the strip under the board; returns the rect to update
+    overlay_rect = pygame.Rect(10, screen.get_height() - 34, 520, 32)
+    screen.fill((245, 245, 255), overlay_rect)
+    stats = frame_clock.summary()
+    if stats:
+        font_small = get_font(14, bold=False)
+        lines = [
+            f"FPS {stats['fps']:.1f}   frame p50 {stats['p50_ms']:.1f}  p95 {stats['p95_ms']:.1f}  p99 {stats['p99_ms']:.1f}  max {stats['max_ms']:.1f} ms",
+            f"AI {stats['ai_ms']:.2f}   rules {stats['rules_ms']:.2f}   render {stats['render_ms']:.2f} ms per frame",
+        ]
+        for i, line in enumerate(lines):
+            screen.blit(render_text(font_small, line, (120, 120, 120)), (overlay_rect.x, overlay_rect.y + i * 16))
+    return overlay_rect
 
 def main():
+    init_display()
     running = True
     in_menu = True
     in_game_modes = False
@@ -608,6 +716,7 @@ def main():
     player_names = ["Player 1", "Player 2"]
     focus_idx = -1
     game_mode = None
+    frame_clock = FrameClock()
     while running:
         if in_menu:
             time_passed = pygame.time.get_ticks()
@@ -628,6 +737,7 @@ def main():
                             elif text == 'Quit':
                                 running = False
             pygame.display.flip()
+            frame_clock.tick()
         elif in_group_members:
             time_passed = pygame.time.get_ticks()
             buttons = draw_group_members(time_passed)
@@ -642,6 +752,7 @@ def main():
                                 in_group_members = False
                                 in_menu = True
             pygame.display.flip()
+            frame_clock.tick()
         elif in_game_modes:
             time_passed = pygame.time.get_ticks()
             buttons = draw_game_modes(time_passed)
@@ -660,6 +771,7 @@ def main():
                                 in_menu = True
                                 in_game_modes = False
             pygame.display.flip()
+            frame_clock.tick()
         elif in_custom:
             ui_rects = draw_customization_screen(selected_colors, selected_size, selected_timer, player_names, focus_idx, selected_difficulty)
             can_start = (
@@ -698,7 +810,8 @@ def main():
                             'difficulty': selected_difficulty,
                             'player_colors': [COLOR_PALETTE[selected_colors[0]], COLOR_PALETTE[selected_colors[1]]],
                             'player_names': player_names[:],
-                            'mode': game_mode
+                            'mode': game_mode,
+                            'seed': int(SEED) if SEED else None
                         }
                     if ui_rects['back_rect'].collidepoint((x, y)):
                         in_custom = False
@@ -711,250 +824,93 @@ def main():
                     elif len(player_names[focus_idx]) < 16 and event.unicode.isprintable():
                         player_names[focus_idx] += event.unicode
             pygame.display.flip()
+            frame_clock.tick()
         elif in_game:
             try:
                 size = game_settings['size']
                 rows, cols = size, size
                 player_colors = game_settings['player_colors']
                 names = game_settings['player_names']
-                timer = game_settings['timer']
-                difficulty = game_settings['difficulty']
                 game_mode = game_settings['mode']
-                
-                # Initialize game state
-                player_positions = [list((0, 0)), list((rows-1, cols-1))]
-                board = np.full((rows, cols), -1)
-                board[player_positions[0][0], player_positions[0][1]] = 0
-                board[player_positions[1][0], player_positions[1][1]] = 1
-                scores = [1, 1]  # Each player starts with 1 tile
-                
-                # Initialize powerups and effects
-                powerups = np.full((rows, cols), -1)
-                powerup_end_times = {0: {}, 1: {}}
-                powerup_effects = {
-                    0: {'shield': False, 'speed_boost': False, 'double_points': False},
-                    1: {'shield': False, 'speed_boost': False, 'double_points': False}
-                }
-                powerup_spawn_timer = pygame.time.get_ticks()
-                POWERUP_SPAWN_INTERVAL = 5000
-                
-                game_running = True
-                start_ticks = pygame.time.get_ticks()
-                player_types = ["AI", "AI"] if game_mode == "AI vs AI" else ["Human", "AI"]
-                last_move_time = {0: 0, 1: 0}
-                MOVE_DELAY = 500
-                freeze_end_time = {0: 0, 1: 0}
-                
-                while game_running:
-                    current_time = pygame.time.get_ticks()
-                    
-                    # Handle game timer
-                    time_left = max(0, timer - (current_time - start_ticks)//1000)
-                    
-                    # Handle powerup spawning
-                    if current_time - powerup_spawn_timer > POWERUP_SPAWN_INTERVAL:
-                        spawn_powerup(powerups)
-                        powerup_spawn_timer = current_time
-                    
-                    # Update powerup effects based on current time and end times
-                    for player in [0, 1]:
-                        if current_time >= powerup_end_times[player].get('shield', 0):
-                            powerup_effects[player]['shield'] = False
-                        if current_time >= powerup_end_times[player].get('speed_boost', 0):
-                            powerup_effects[player]['speed_boost'] = False
-                        if current_time >= powerup_end_times[player].get('double_points', 0):
-                            powerup_effects[player]['double_points'] = False
-                    
-                    # Calculate move delay based on speed boost
-                    move_delays = [MOVE_DELAY, MOVE_DELAY]
-                    if powerup_effects[0]['speed_boost']:
-                        move_delays[0] = MOVE_DELAY // 7
-                    if powerup_effects[1]['speed_boost']:
-                        move_delays[1] = MOVE_DELAY // 7
-                    
-                    # Handle AI moves
-                    for player_idx in [0, 1]:
-                        if current_time < freeze_end_time[player_idx]: continue  # skip move if frozen
-                        if current_time - last_move_time[player_idx] >= move_delays[player_idx]:
-                            if player_types[player_idx] == "AI":
-                                move_distance = 2 if powerup_effects[player_idx]['speed_boost'] else 1
-                                ai_new_pos = ai_move(board, player_positions[player_idx], rows, cols, difficulty, player_idx, player_positions, game_mode, powerups)
-                                
-                                # Ensure the new position is valid
-                                if not (0 <= ai_new_pos[0] < rows and 0 <= ai_new_pos[1] < cols):
-                                    continue
-                                
-                                # Handle powerup collection
-                                if powerups[ai_new_pos[0], ai_new_pos[1]] != -1:
-                                    powerup_type = powerups[ai_new_pos[0], ai_new_pos[1]]
-                                    if powerup_type == FREEZE:
-                                        prev_end = freeze_end_time[1 - player_idx]
-                                        if prev_end > current_time:
-                                            freeze_end_time[1 - player_idx] = prev_end + POWERUP_TYPES[FREEZE]['duration'] * 1000
-                                        else:
-                                            freeze_end_time[1 - player_idx] = current_time + POWERUP_TYPES[FREEZE]['duration'] * 1000
-                                    elif powerup_type == BONUS:
-                                        board[ai_new_pos[0], ai_new_pos[1]] = player_idx
-                                        for r in range(rows):
-                                            for c in range(cols):
-                                                if board[r, c] == -1 and (r != ai_new_pos[0] or c != ai_new_pos[1]):
-                                                    board[r, c] = player_idx
-                                                    break
-                                            else:
-                                                continue
-                                            break
-                                    elif powerup_type == SHIELD:
-                                        powerup_effects[player_idx]['shield'] = True
-                                        prev_end = powerup_end_times[player_idx].get('shield', 0)
-                                        if prev_end > current_time:
-                                            powerup_end_times[player_idx]['shield'] = prev_end + POWERUP_TYPES[SHIELD]['duration'] * 1000
-                                        else:
-                                            powerup_end_times[player_idx]['shield'] = current_time + POWERUP_TYPES[SHIELD]['duration'] * 1000
-                                    elif powerup_type == SPEED_BOOST:
-                                        powerup_effects[player_idx]['speed_boost'] = True
-                                        prev_end = powerup_end_times[player_idx].get('speed_boost', 0)
-                                        if prev_end > current_time:
-                                            powerup_end_times[player_idx]['speed_boost'] = prev_end + POWERUP_TYPES[SPEED_BOOST]['duration'] * 1000
-                                        else:
-                                            powerup_end_times[player_idx]['speed_boost'] = current_time + POWERUP_TYPES[SPEED_BOOST]['duration'] * 1000
-                                    elif powerup_type == TERRITORY_BOMB:
-                                        for adr, adc in [(-1,0), (1,0), (0,-1), (0,1), (-1,-1), (-1,1), (1,-1), (1,1)]:
-                                            nr, nc = ai_new_pos[0] + adr, ai_new_pos[1] + adc
-                                            if 0 <= nr < rows and 0 <= nc < cols:
-                                                board[nr, nc] = player_idx
-                                    elif powerup_type == DOUBLE_POINTS:
-                                        powerup_effects[player_idx]['double_points'] = True
-                                        prev_end = powerup_end_times[player_idx].get('double_points', 0)
-                                        if prev_end > current_time:
-                                            powerup_end_times[player_idx]['double_points'] = prev_end + POWERUP_TYPES[DOUBLE_POINTS]['duration'] * 1000
-                                        else:
-                                            powerup_end_times[player_idx]['double_points'] = current_time + POWERUP_TYPES[DOUBLE_POINTS]['duration'] * 1000
-                                    powerups[ai_new_pos[0], ai_new_pos[1]] = -1
-                                
-                                # Update board and scores
-                                cell_owner = board[ai_new_pos[0], ai_new_pos[1]]
-                                if not (cell_owner != -1 and powerup_effects[cell_owner]['shield'] and cell_owner != player_idx):
-                                    if cell_owner != player_idx:
-                                        board[ai_new_pos[0], ai_new_pos[1]] = player_idx
-                                        if cell_owner != -1 and cell_owner != player_idx:
-                                            if scores[cell_owner] > 0:
-                                                scores[cell_owner] -= 1
-                                        if powerup_effects[player_idx]['double_points']:
-                                            scores[player_idx] += 2
-                                        else:
-                                            scores[player_idx] += 1
-                                
-                                player_positions[player_idx] = ai_new_pos
-                                last_move_time[player_idx] = current_time
-                    
-                    # Handle human input in Human vs AI mode
-                    if game_mode == "Human vs AI":
-                        if current_time < freeze_end_time[0]: continue  # skip input if frozen
+
+                # Initialize game state; all rules live in engine.step
+                state = GameState.from_settings(game_settings, now_ms=pygame.time.get_ticks())
+                print(f"Game seed: {state.seed}")
+                # Background thinkers and the replay file are closed even if the game fails,
+                # or their processes outlive it and hold up interpreter exit
+                actions = []
+                current_time = state.start_ticks
+                try:
+                    if REPLAY_DIR:
+                        os.makedirs(REPLAY_DIR, exist_ok=True)
+                        replay_path = os.path.join(REPLAY_DIR, time.strftime('%Y%m%d-%H%M%S') + '.trpl')
+                        state.recorder = Recorder(replay_path, state, player_names=names)
+                    # Hard+ thinks in a background process so drawing and input never wait on the search
+                    actions = [timed_policy(async_policy(), frame_clock) if ptype == "AI" else None for ptype in state.player_types]
+                    layer = BoardLayer()
+                    frame_clock.reset()
+                    profiler.reset()
+
+                    while not state.over:
+                        current_time = pygame.time.get_ticks()
+                        human_moves = []
                         for event in pygame.event.get():
                             if event.type == pygame.QUIT:
                                 running = False
-                                game_running = False
-                            if event.type == pygame.KEYDOWN:
-                                for key, delta in PLAYER_KEYS[0].items():
-                                    if event.key == key:
-                                        move_distance = 2 if powerup_effects[0]['speed_boost'] else 1
-                                        valid_move = True
-                                        prev_pos = player_positions[0][:]
-                                        for step in range(1, move_distance + 1):
-                                            new_row = prev_pos[0] + delta[0] * step
-                                            new_col = prev_pos[1] + delta[1] * step
-                                            if not (0 <= new_row < rows and 0 <= new_col < cols):
-                                                valid_move = False
-                                                break
-                                        if valid_move:
-                                            for step in range(1, move_distance + 1):
-                                                new_row = prev_pos[0] + delta[0] * step
-                                                new_col = prev_pos[1] + delta[1] * step
-                                                # Check for powerup
-                                                if powerups[new_row, new_col] != -1:
-                                                    powerup_type = powerups[new_row, new_col]
-                                                    if powerup_type == FREEZE:
-                                                        prev_end = freeze_end_time[1]
-                                                        if prev_end > current_time:
-                                                            freeze_end_time[1] = prev_end + POWERUP_TYPES[FREEZE]['duration'] * 1000
-                                                        else:
-                                                            freeze_end_time[1] = current_time + POWERUP_TYPES[FREEZE]['duration'] * 1000
-                                                    elif powerup_type == BONUS:
-                                                        board[new_row, new_col] = 0
-                                                        for r in range(rows):
-                                                            for c in range(cols):
-                                                                if board[r, c] == -1 and (r != new_row or c != new_col):
-                                                                    board[r, c] = 0
-                                                                    break
-                                                            else:
-                                                                continue
-                                                            break
-                                                    elif powerup_type == SHIELD:
-                                                        powerup_effects[0]['shield'] = True
-                                                        prev_end = powerup_end_times[0].get('shield', 0)
-                                                        if prev_end > current_time:
-                                                            powerup_end_times[0]['shield'] = prev_end + POWERUP_TYPES[SHIELD]['duration'] * 1000
-                                                        else:
-                                                            powerup_end_times[0]['shield'] = current_time + POWERUP_TYPES[SHIELD]['duration'] * 1000
-                                                    elif powerup_type == SPEED_BOOST:
-                                                        powerup_effects[0]['speed_boost'] = True
-                                                        prev_end = powerup_end_times[0].get('speed_boost', 0)
-                                                        if prev_end > current_time:
-                                                            powerup_end_times[0]['speed_boost'] = prev_end + POWERUP_TYPES[SPEED_BOOST]['duration'] * 1000
-                                                        else:
-                                                            powerup_end_times[0]['speed_boost'] = current_time + POWERUP_TYPES[SPEED_BOOST]['duration'] * 1000
-                                                    elif powerup_type == TERRITORY_BOMB:
-                                                        for adr, adc in [(-1,0), (1,0), (0,-1), (0,1), (-1,-1), (-1,1), (1,-1), (1,1)]:
-                                                            anr, anc = new_row + adr, new_col + adc
-                                                            if 0 <= anr < rows and 0 <= anc < cols:
-                                                                board[anr, anc] = 0
-                                                    elif powerup_type == DOUBLE_POINTS:
-                                                        powerup_effects[0]['double_points'] = True
-                                                        prev_end = powerup_end_times[0].get('double_points', 0)
-                                                        if prev_end > current_time:
-                                                            powerup_end_times[0]['double_points'] = prev_end + POWERUP_TYPES[DOUBLE_POINTS]['duration'] * 1000
-                                                        else:
-                                                            powerup_end_times[0]['double_points'] = current_time + POWERUP_TYPES[DOUBLE_POINTS]['duration'] * 1000
-                                                    powerups[new_row, new_col] = -1
-                                                # PATCH: Score only increases if a new tile is claimed (not if moving onto own tile)
-                                                cell_owner = board[new_row, new_col]
-                                                if not (cell_owner != -1 and powerup_effects[cell_owner]['shield'] and cell_owner != 0):
-                                                    if cell_owner != 0:
-                                                        board[new_row, new_col] = 0
-                                                        if cell_owner != -1 and cell_owner != 0:
-                                                            if scores[cell_owner] > 0:
-                                                                scores[cell_owner] -= 1
-                                                        if powerup_effects[0]['double_points']:
-                                                            scores[0] += 2
-                                                        else:
-                                                            scores[0] += 1
-                                            player_positions[0] = [prev_pos[0] + delta[0] * move_distance, prev_pos[1] + delta[1] * move_distance]
-                    
-                    ui_rects = draw_game_screen(board, powerups, player_positions, names, player_colors, scores, time_left, rows, cols, player_types, powerup_end_times, powerup_effects, freeze_end_time, 0)
-                    pygame.display.flip()
-                    pygame.time.Clock().tick(60)
-                    
-                    if time_left <= 0:
-                        game_running = False
-                
-                scores = [np.sum(board == 0), np.sum(board == 1)]
-                winner = 0 if scores[0] > scores[1] else 1 if scores[1] > scores[0] else -1
+                                state.over = True
+                            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                                frame_clock.show_overlay = not frame_clock.show_overlay
+                                layer = BoardLayer()
+                            # Handle human input in Human vs AI mode
+                            if event.type == pygame.KEYDOWN and state.player_types[0] == "Human" and event.key in PLAYER_KEYS[0]:
+                                human_moves.append(PLAYER_KEYS[0][event.key])
+
+                        # Rules time is the whole step minus what the policies took
+                        start = time.perf_counter()
+                        ai_before = frame_clock.current['ai']
+                        step(state, actions, current_time)
+                        for delta in human_moves:
+                            step(state, [human_path(state, 0, delta), None], current_time)
+                        frame_clock.add('rules', start)
+                        frame_clock.current['rules'] -= frame_clock.current['ai'] - ai_before
+
+                        start = time.perf_counter()
+                        dirty_rects = draw_game_screen(state.board, state.powerups, state.player_positions, names, player_colors, state.scores, state.time_left, rows, cols, state.player_types, state.powerup_end_times, state.powerup_effects, state.freeze_end_time, 0, layer)
+                        if frame_clock.show_overlay:
+                            dirty_rects.append(draw_frame_overlay(frame_clock))
+                        pygame.display.update(dirty_rects)
+                        frame_clock.add('render', start)
+                        frame_clock.tick()
+                finally:
+                    for action in actions:
+                        if action is not None:
+                            action.close()
+                    if state.recorder is not None:
+                        state.recorder.close(state, current_time)
+
+                if frame_clock.show_overlay:
+                    print(f"Frame stats: {frame_clock.summary()}")
+                if profiler.enabled:
+                    settings = {key: game_settings[key] for key in ('size', 'timer', 'difficulty', 'mode')}
+                    profiler.dump(PROFILE_PATH, settings=settings, frame_stats=frame_clock.summary())
+                scores = state.final_scores()
+                winner = state.winner()
                 screen.fill((255,255,255))
-                font_big = pygame.font.SysFont('Roboto', 48, bold=True)
+                font_big = get_font(48)
                 if winner == -1:
                     msg = 'It\'s a tie!'
                 else:
                     msg = f'{names[winner]} wins!'
-                text = font_big.render(msg, True, (80,80,120))
+                text = render_text(font_big, msg, (80,80,120))
                 screen.blit(text, text.get_rect(center=(screen.get_width()//2, screen.get_height()//2-40)))
                 # Display both player scores
-                font_score = pygame.font.SysFont('Roboto', 36, bold=True)
+                font_score = get_font(36)
                 score_text = f"{names[0]}: {scores[0]}    {names[1]}: {scores[1]}"
-                score_surf = font_score.render(score_text, True, (80,80,120))
+                score_surf = render_text(font_score, score_text, (80,80,120))
                 screen.blit(score_surf, score_surf.get_rect(center=(screen.get_width()//2, screen.get_height()//2+10)))
-                font_count = pygame.font.SysFont('Roboto', 36, bold=True)
+                font_count = get_font(36)
                 for countdown in range(3, 0, -1):
-                    count_text = font_count.render(f'Redirecting in {countdown}...', True, (120,120,120))
+                    count_text = render_text(font_count, f'Redirecting in {countdown}...', (120,120,120))
                     screen.blit(count_text, count_text.get_rect(center=(screen.get_width()//2, screen.get_height()//2+40)))
                     screen.blit(score_surf, score_surf.get_rect(center=(screen.get_width()//2, screen.get_height()//2+10)))
                     pygame.display.flip()
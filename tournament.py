@@ -0,0 +1,167 @@
+import argparse
+import csv
+import itertools
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from engine import BOARD_SIZES, TIMER_OPTIONS, DIFFICULTY_OPTIONS
+from ai import ai_move, load_weights, TranspositionTable, SEARCH_TIME_FRACTION, SEARCH_DEPTH
+from headless import run_match, SimulatedClock, TICK_MS
+
+CSV_FIELDS = ['game', 'player0', 'player1', 'size', 'timer', 'seed', 'score0', 'score1', 'winner', 'seconds']
+# Resamples for the Elo confidence intervals
+BOOTSTRAP_SAMPLES = 200
+
+def parse_config(spec):
+    # "<difficulty>[@depth][:weights.json]", e.g. "medium", "hard+@6" or "hard+@4:tuned.json". A depth
+    # makes Hard+ search to that depth instead of for a slice of its move delay; a weights file
+    # (written by tune.py) replaces the default evaluation weights
+    config, _, weights_path = spec.partition(':')
+    name, _, depth = config.partition('@')
+    difficulties = [option.lower() for option in DIFFICULTY_OPTIONS]
+    if name.lower() not in difficulties:
+        raise argparse.ArgumentTypeError(f"unknown difficulty {name!r}; choose from {', '.join(DIFFICULTY_OPTIONS)}")
+    if weights_path and not os.path.exists(weights_path):
+        raise argparse.ArgumentTypeError(f"no weights file {weights_path!r}")
+    return {'name': spec, 'difficulty': difficulties.index(name.lower()), 'depth': int(depth) if depth else None,
+            'weights': load_weights(weights_path) if weights_path else None}
+
+def config_policy(config):
+    # engine.step action for one ai_move configuration, with a transposition table per match
+    tables = {}
+    def policy(state, player_idx):
+        if player_idx not in tables:
+            tables[player_idx] = TranspositionTable(state.rows, state.cols)
+        pos = state.player_positions[player_idx]
+        budget = None if config['depth'] else state.move_delays()[player_idx] * SEARCH_TIME_FRACTION
+        return [ai_move(state.board, pos, state.rows, state.cols, config['difficulty'], player_idx, state.player_positions,
+                        state.mode, state.powerups, budget, tables[player_idx], None, state.player_rngs[player_idx],
+                        config['depth'] or SEARCH_DEPTH, config.get('weights'))]
+    return policy
+
+def play_game(job):
+    # Runs in a pool worker
+    game, configs, size, timer, seed, tick_ms = job
+    start = time.perf_counter()
+    state = run_match({'size': size, 'timer': timer, 'difficulty': max(c['difficulty'] for c in configs), 'seed': seed},
+                      SimulatedClock(tick_ms), [config_policy(c) for c in configs])
+    scores = state.final_scores()
+    return {'game': game, 'player0': configs[0]['name'], 'player1': configs[1]['name'], 'size': size, 'timer': timer,
+            'seed': seed, 'score0': scores[0], 'score1': scores[1], 'winner': state.winner(),
+            'seconds': round(time.perf_counter() - start, 3)}
+
+def pairings(configs, mode):
+    if mode == 'gauntlet':
+        return [(configs[0], other) for other in configs[1:]]
+    return list(itertools.combinations(configs, 2))
+
+def schedule(configs, mode, sizes, timers, games, seed, tick_ms):
+    # Every pairing plays each seed twice with sides swapped, so moving first evens out
+    jobs = []
+    for a, b in pairings(configs, mode):
+        for size, timer in itertools.product(sizes, timers):
+            for i in range(games):
+                game_seed = seed + i // 2
+                sides = (a, b) if i % 2 == 0 else (b, a)
+                jobs.append((len(jobs), sides, size, timer, game_seed, tick_ms))
+    return jobs
+
+def wilson(score, n, z=1.96):
+    # 95% interval for a win rate, draws counted as half a win
+    if n == 0:
+        return 0.0, 1.0
+    p = score / n
+    center = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return max(0.0, center - half), min(1.0, center + half)
+
+def fit_elo(names, games, iterations=100):
+    # Bradley-Terry ratings by minorization-maximization, draws as half a win each way, with
+    # one virtual draw per pairing so a perfect record stays finite. Mean rating is 1500
+    index = {name: i for i, name in enumerate(names)}
+    n = len(names)
+    wins = np.zeros((n, n))
+    for g in games:
+        i, j = index[g['player0']], index[g['player1']]
+        result = 1.0 if g['winner'] == 0 else 0.0 if g['winner'] == 1 else 0.5
+        wins[i, j] += result
+        wins[j, i] += 1 - result
+    played = wins + wins.T
+    wins += 0.5 * (played > 0)
+    played = wins + wins.T
+    gamma = np.ones(n)
+    for _ in range(iterations):
+        denom = (played / (gamma[:, None] + gamma[None, :])).sum(axis=1)
+        gamma = np.where(denom > 0, wins.sum(axis=1) / np.maximum(denom, 1e-12), gamma)
+        gamma /= np.exp(np.log(gamma).mean())
+    return 1500 + 400 * np.log10(gamma)
+
+def standings(names, games, rng_seed=0):
+    ratings = fit_elo(names, games)
+    rng = np.random.default_rng(rng_seed)
+    samples = np.array([fit_elo(names, [games[k] for k in rng.integers(0, len(games), len(games))])
+                        for _ in range(BOOTSTRAP_SAMPLES)]) if games else np.zeros((1, len(names)))
+    low, high = np.percentile(samples, [2.5, 97.5], axis=0)
+    table = []
+    for i, name in enumerate(names):
+        played = [g for g in games if name in (g['player0'], g['player1'])]
+        wins = sum(1 for g in played if g['winner'] != -1 and g[f"player{g['winner']}"] == name)
+        draws = sum(1 for g in played if g['winner'] == -1)
+        score = wins + 0.5 * draws
+        rate_low, rate_high = wilson(score, len(played))
+        table.append({'name': name, 'games': len(played), 'wins': wins, 'draws': draws, 'losses': len(played) - wins - draws,
+                      'score_rate': round(score / len(played), 4) if played else 0.0,
+                      'score_rate_ci': [round(rate_low, 4), round(rate_high, 4)],
+                      'elo': round(float(ratings[i]), 1), 'elo_ci': [round(float(low[i]), 1), round(float(high[i]), 1)]})
+    return sorted(table, key=lambda row: -row['elo'])
+
+def main():
+    parser = argparse.ArgumentParser(description='Round-robin or gauntlet tournament between AI configurations')
+    parser.add_argument('players', nargs='+', type=parse_config, help='difficulty[@depth][:weights.json], e.g. easy medium hard hard+@6')
+    parser.add_argument('--mode', choices=['round-robin', 'gauntlet'], default='round-robin', help='gauntlet plays the first player against each other one')
+    parser.add_argument('--games', type=int, default=20, help='games per pairing, board size and timer')
+    parser.add_argument('--sizes', type=int, nargs='+', default=BOARD_SIZES)
+    parser.add_argument('--timers', type=int, nargs='+', default=[TIMER_OPTIONS[0]])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--tick', type=int, default=TICK_MS)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--csv', default='tournament.csv', help='one row per game, written as games finish')
+    parser.add_argument('--json', default='tournament.json', help='standings and settings')
+    args = parser.parse_args()
+    names = [c['name'] for c in args.players]
+    if len(set(names)) != len(names):
+        parser.error('players must be distinct')
+    jobs = schedule(args.players, args.mode, args.sizes, args.timers, args.games, args.seed, args.tick)
+    games = []
+    start = time.perf_counter()
+    with open(args.csv, 'w', newline='') as f, ProcessPoolExecutor(args.workers) as executor:
+        writer = csv.DictWriter(f, CSV_FIELDS)
+        writer.writeheader()
+        for future in as_completed([executor.submit(play_game, job) for job in jobs]):
+            result = future.result()
+            games.append(result)
+            writer.writerow(result)
+            f.flush()
+            if len(games) % 50 == 0 or len(games) == len(jobs):
+                elapsed = time.perf_counter() - start
+                print(f"{len(games)}/{len(jobs)} games, {len(games) / elapsed:.1f} games/s")
+    elapsed = time.perf_counter() - start
+    games.sort(key=lambda g: g['game'])
+    table = standings(names, games, args.seed)
+    print(f"{'player':<12} {'games':>5} {'W-D-L':>11} {'score':>6} {'95% CI':>15} {'Elo':>7} {'95% CI':>15}")
+    for row in table:
+        wdl = f"{row['wins']}-{row['draws']}-{row['losses']}"
+        print(f"{row['name']:<12} {row['games']:>5} {wdl:>11} {row['score_rate']:>6.3f} {str(row['score_rate_ci']):>15} {row['elo']:>7.1f} {str(row['elo_ci']):>15}")
+    print(f"{len(games)} games in {elapsed:.2f}s ({len(games) / elapsed:.1f} games/s) on {args.workers} workers")
+    with open(args.json, 'w') as f:
+        json.dump({'players': args.players, 'mode': args.mode, 'sizes': args.sizes, 'timers': args.timers, 'games_per_pairing': args.games,
+                   'seed': args.seed, 'workers': args.workers, 'elapsed_s': round(elapsed, 3), 'games_per_sec': round(len(games) / elapsed, 2),
+                   'standings': table}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
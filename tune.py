@@ -0,0 +1,96 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ai import DEFAULT_WEIGHTS, WEIGHTS_PATH, HARD_PLUS, eval_weights
+from headless import TICK_MS
+from tournament import play_game
+
+# Weights SPSA moves, and how far one unit of its parameter vector moves each of them. 'tiles'
+# stays at 1 since only the ratios between weights change which move the search picks
+TUNED = ['mobility', 'center', 'powerup', 'frontier']
+STEP = {'mobility': 0.1, 'center': 0.05, 'powerup': 0.1, 'frontier': 0.1}
+# Standard SPSA gain decay exponents
+ALPHA, GAMMA = 0.602, 0.101
+
+def to_weights(theta, features):
+    weights = dict(eval_weights)
+    for name, value in zip(features, theta):
+        weights[name] = round(float(value) * STEP[name], 6)
+    return weights
+
+def match_score(executor, weights_a, weights_b, games, sizes, timer, depth, seed, tick_ms, chunksize):
+    # Score rate of weights_a against weights_b over games Hard+ games at a fixed depth, each seed
+    # played with both sides, so the two sets face the same boards and powerup spawns
+    a = {'name': 'a', 'difficulty': HARD_PLUS, 'depth': depth, 'weights': weights_a}
+    b = {'name': 'b', 'difficulty': HARD_PLUS, 'depth': depth, 'weights': weights_b}
+    jobs = [(i, (a, b) if i % 2 == 0 else (b, a), sizes[(i // 2) % len(sizes)], timer, seed + i // 2, tick_ms) for i in range(games)]
+    score = 0.0
+    for result in executor.map(play_game, jobs, chunksize=chunksize):
+        if result['winner'] == -1:
+            score += 0.5
+        elif result[f"player{result['winner']}"] == 'a':
+            score += 1
+    return score / games
+
+def tune(args, executor):
+    features = args.features
+    theta = np.array([eval_weights[name] / STEP[name] for name in features])
+    rng = np.random.default_rng(args.seed)
+    chunksize = max(1, args.games // (4 * args.workers))
+    stability = args.iterations / 10
+    seed = args.seed
+    for k in range(args.iterations):
+        start = time.perf_counter()
+        a_k = args.a / (k + 1 + stability) ** ALPHA
+        c_k = args.c / (k + 1) ** GAMMA
+        delta = rng.choice([-1.0, 1.0], len(features))
+        plus, minus = to_weights(theta + c_k * delta, features), to_weights(theta - c_k * delta, features)
+        # Playing theta+ against theta- directly: its score over 1/2 stands in for f(theta+) - f(theta-)
+        score = match_score(executor, plus, minus, args.games, args.sizes, args.timer, args.depth, seed, args.tick, chunksize)
+        seed += args.games // 2 + 1
+        theta = theta + a_k * (score - 0.5) / (c_k * delta)
+        elapsed = time.perf_counter() - start
+        weights = to_weights(theta, features)
+        print(f"iter {k + 1:>3}  score+ {score:.3f}  " + '  '.join(f"{name} {weights[name]:+.4f}" for name in features)
+              + f"  {args.games / elapsed:.1f} games/s")
+    return to_weights(theta, features), seed
+
+def main():
+    parser = argparse.ArgumentParser(description='Fit the Hard+ evaluation weights with SPSA over headless self-play')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--games', type=int, default=200, help='games per iteration (rounded up to even)')
+    parser.add_argument('--features', nargs='+', choices=TUNED, default=TUNED)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[8, 10])
+    parser.add_argument('--timer', type=int, default=10)
+    parser.add_argument('--depth', type=int, default=3, help='fixed Hard+ search depth during tuning')
+    parser.add_argument('--a', type=float, default=2.0, help='SPSA step gain')
+    parser.add_argument('--c', type=float, default=1.0, help='SPSA perturbation size, in STEP units')
+    parser.add_argument('--check', type=int, default=400, help='games of the result against DEFAULT_WEIGHTS at the end')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--tick', type=int, default=TICK_MS)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--output', default=WEIGHTS_PATH, help='weights file ai_move loads')
+    args = parser.parse_args()
+    args.games += args.games % 2
+    start = time.perf_counter()
+    with ProcessPoolExecutor(args.workers) as executor:
+        weights, seed = tune(args, executor)
+        score = None
+        if args.check:
+            # Fresh seeds, so this isn't scored on boards the tuning already saw
+            score = match_score(executor, weights, DEFAULT_WEIGHTS, args.check, args.sizes, args.timer, args.depth, seed, args.tick, max(1, args.check // (4 * args.workers)))
+            print(f"score against the default weights over {args.check} games: {score:.3f}")
+    elapsed = time.perf_counter() - start
+    with open(args.output, 'w') as f:
+        json.dump({'weights': weights, 'score_vs_default': score, 'iterations': args.iterations, 'games_per_iteration': args.games,
+                   'sizes': args.sizes, 'timer': args.timer, 'depth': args.depth, 'seed': args.seed,
+                   'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'elapsed_s': round(elapsed, 3)}, f, indent=2)
+    print(f"Weights written to {args.output} ({elapsed:.1f}s)")
+
+if __name__ == '__main__':
+    main()